@@ -0,0 +1,113 @@
+from typing import Any, Optional
+
+from cachetools import TTLCache
+
+# How long decoded read results stay fresh, by endpoint path. Reads not listed aren't cached.
+DEFAULT_TTLS = {
+    # Only changes when you clear a new zone in adventure mode.
+    '/crabada-user/private/campaign/all/mine-zones': 6 * 60 * 60,
+    '/crabada-user/private/money/info': 60,
+    '/crabada-user/private/inventory/info': 10,
+    '/crabada-user/private/sync': 10,
+    '/crabada-user/private/crabada/mine': 10,
+    '/crabada-user/private/campaign/mine-zones/mine/open/miner': 10,
+    '/crabada-user/private/campaign/mine-zones/mine/active/looting': 10,
+}
+
+# Cached reads that a mutation may change, by mutation path.
+DEFAULT_INVALIDATIONS = {
+    '/crabada-user/private/campaign/mine-zones/mine/create': [
+        '/crabada-user/private/campaign/mine-zones/mine/open/miner',
+        '/crabada-user/private/crabada/mine',
+        '/crabada-user/private/sync',
+    ],
+    '/crabada-user/private/campaign/mine-zones/mine/claim': [
+        '/crabada-user/private/campaign/mine-zones/mine/open/miner',
+        '/crabada-user/private/crabada/mine',
+        '/crabada-user/private/sync',
+        '/crabada-user/private/inventory/info',
+        '/crabada-user/private/money/info',
+    ],
+    '/crabada-user/private/campaign/mine-zones/mine/looter-claim': [
+        '/crabada-user/private/campaign/mine-zones/mine/active/looting',
+        '/crabada-user/private/crabada/mine',
+        '/crabada-user/private/sync',
+        '/crabada-user/private/inventory/info',
+        '/crabada-user/private/money/info',
+    ],
+    '/crabada-user/private/crabada/eat': [
+        '/crabada-user/private/crabada/mine',
+        '/crabada-user/private/sync',
+        '/crabada-user/private/inventory/info',
+    ],
+    '/crabada-user/private/crafting/money-food': [
+        '/crabada-user/private/inventory/info',
+        '/crabada-user/private/money/info',
+    ],
+}
+
+
+class ResponseCache(object):
+    """TTL cache of decoded read results, keyed by endpoint path and params.
+
+    Each endpoint gets its own TTLCache since cachetools only supports one TTL per cache.
+    Mutations drop the reads they might change, via the invalidation map.
+
+    Each path also has a generation, bumped whenever it's invalidated. Read it before
+    fetching and pass it to put(), so a read that was in flight when a mutation ran
+    doesn't put pre-mutation data back in the cache.
+    """
+
+    def __init__(self,
+                 ttls: Optional[dict[str, float]] = None,
+                 invalidations: Optional[dict[str, list[str]]] = None,
+                 max_entries_per_path: int = 16):
+        ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.invalidations = DEFAULT_INVALIDATIONS if invalidations is None else invalidations
+        self._caches = {path: TTLCache(maxsize=max_entries_per_path, ttl=ttl) for path, ttl in ttls.items()}
+        self._generations: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(params: dict) -> tuple:
+        return tuple(sorted(params.items()))
+
+    def get(self, path: str, params: dict) -> Optional[Any]:
+        cache = self._caches.get(path)
+        if cache is None:
+            return None
+        value = cache.get(self.key(params))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def generation(self, path: str) -> int:
+        return self._generations.get(path, 0)
+
+    def put(self, path: str, params: dict, value: Any, generation: Optional[int] = None):
+        """Cache a read, unless the path was invalidated since `generation` was read."""
+        cache = self._caches.get(path)
+        if cache is None or (generation is not None and generation != self.generation(path)):
+            return
+        cache[self.key(params)] = value
+
+    def invalidate_for(self, mutation_path: str):
+        """Drop every cached read that the mutation might have changed."""
+        for path in self.invalidations.get(mutation_path, []):
+            self.invalidate(path)
+
+    def invalidate(self, path: str):
+        self._generations[path] = self.generation(path) + 1
+        cache = self._caches.get(path)
+        if cache is not None:
+            cache.clear()
+
+    def summary(self) -> str:
+        return f'{self.hits} hits, {self.misses} misses'
+
+    def clear(self):
+        for path in self._caches:
+            self.invalidate(path)
@@ -1,10 +1,26 @@
+import asyncio
 import json
-from typing import Any, Union
+import logging
+import time
+from typing import Any, Optional, Union
+from urllib.parse import urlparse
 
-import requests
+import aiohttp
 
+from battle_client.cache import ResponseCache
 from battle_client.encryption import crabada_checksum
-from battle_client.types import LoginInfo, MineInfo, CrabadaData, MoneyItem, InventoryItem, MineZoneInfo
+from battle_client.templates import Field, RequestTemplate, dumps
+from battle_client.recording import RecordingTransport
+from battle_client.retry import ApiError, CircuitBreakers, CircuitOpenError, RetryPolicy
+from battle_client.single_flight import SingleFlight
+from battle_client.transport import HttpTransport
+from battle_client.types import LoginInfo, MineInfo, CrabadaData, MoneyItem, InventoryItem, MineZoneInfo, \
+    LV1_MATERIAL_IDS
+from common.config_local import DEFAULT_CONFIG
+from common.metrics import DEFAULT_METRICS
+from common.rate_limit import RateLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
 
 # Headers that should be passed on every request.
 # Authz is per account but should always be provided.
@@ -18,220 +34,511 @@ DEFAULT_HEADERS = {
     'X-Unity-Version': '2020.3.31f1',
 }
 
-
-class BattleClient:
-    """HTTP client for Crabada battle game."""
-
-    # All battle api requests go here.
-    BATTLE_URL = 'https://battle-system-api.crabada.com'
-
-    def __init__(self, expect_keys=True):
-        # Required for all requests
-        self.access_token = ''
+# Headers for mutations with a JSON body and Hash, minus auth and the Hash itself.
+DEFAULT_POST_HEADERS = {**DEFAULT_HEADERS, 'Content-Type': 'application/json'}
+
+
+def lv1_recipe_body(recipe_id: int, output_id: int) -> dict[str, Any]:
+    """Crafting body for the recipes that take one of each level 1 material per output."""
+    body = {
+        'recipe_id': recipe_id,
+        'output_id': output_id,
+        'amount': Field('amount'),
+    }
+    for i, material_id in enumerate(LV1_MATERIAL_IDS, start=1):
+        body[f'material_{i}_id'] = material_id
+        body[f'material_{i}_amount'] = Field('amount')
+    return body
+
+
+# Mutations the bot sends all the time, with everything but the ids/amounts pre-serialized.
+START_MINE = RequestTemplate('/crabada-user/private/campaign/mine-zones/mine/create', {
+    'node_id': Field('node_id'),
+    'crabada_id_1': Field('crab1'),
+    'crabada_id_2': Field('crab2'),
+    'crabada_id_3': Field('crab3'),
+    'p1': Field('crab1p'),
+    'p2': Field('crab2p'),
+    'p3': Field('crab3p'),
+})
+CLAIM_MINE = RequestTemplate('/crabada-user/private/campaign/mine-zones/mine/claim', {'mine_id': Field('mine_id')})
+CLAIM_LOOT = RequestTemplate('/crabada-user/private/campaign/mine-zones/mine/looter-claim',
+                             {'mine_id': Field('mine_id')})
+FEED_CRAB = RequestTemplate('/crabada-user/private/crabada/eat', {
+    'crabada_id': Field('crabada_id'),
+    'food_id': Field('food_id'),
+})
+CRAFT_LV1_FOOD = RequestTemplate('/crabada-user/private/crafting/money-food',
+                                 lv1_recipe_body(6, InventoryItem.SANDWICH_ID))
+CRAFT_LV1_TUS = RequestTemplate('/crabada-user/private/crafting/money-food', lv1_recipe_body(1, 1))
+
+# Request classes used for rate limiting.
+READ = 'read'
+MUTATION = 'mutation'
+
+API_LATENCY = DEFAULT_METRICS.histogram('battle_api_request_seconds',
+                                        'Battle API round trip time, not counting rate limiting',
+                                        ['method', 'endpoint'])
+API_ERRORS = DEFAULT_METRICS.counter('battle_api_errors_total',
+                                     'Battle API requests that failed, by error_code (or exception type)',
+                                     ['endpoint', 'error_code'])
+API_RETRIES = DEFAULT_METRICS.counter('battle_api_retries_total', 'Battle API requests sent again after failing',
+                                      ['endpoint'])
+CIRCUIT_REJECTED = DEFAULT_METRICS.counter('battle_api_circuit_rejected_total',
+                                           'Requests not sent because the endpoint\'s circuit was open',
+                                           ['endpoint'])
+CIRCUIT_OPENED = DEFAULT_METRICS.counter('battle_api_circuit_opened_total',
+                                         'Times an endpoint failed enough to open its circuit', ['endpoint'])
+READS_SHARED = DEFAULT_METRICS.counter('battle_api_reads_shared_total',
+                                       'Reads answered by an identical read already in flight', ['endpoint'])
+
+
+def default_rate_limiter() -> RateLimiter:
+    """Per-account read/mutation limits from the config."""
+    return RateLimiter({
+        READ: TokenBucket(DEFAULT_CONFIG.battle_read_rate, DEFAULT_CONFIG.battle_read_burst),
+        MUTATION: TokenBucket(DEFAULT_CONFIG.battle_mutation_rate, DEFAULT_CONFIG.battle_mutation_burst),
+    })
+
+
+def default_retry_policy() -> RetryPolicy:
+    return RetryPolicy(DEFAULT_CONFIG.battle_retry_attempts, DEFAULT_CONFIG.battle_retry_base_delay,
+                       DEFAULT_CONFIG.battle_retry_max_delay)
+
+
+# Shared by every client in the process by default; an outage hits every account alike.
+DEFAULT_BREAKERS = CircuitBreakers(DEFAULT_CONFIG.battle_breaker_failures, DEFAULT_CONFIG.battle_breaker_reset_sec)
+
+
+def default_transport(max_concurrent_requests: Optional[int] = None) -> Union[HttpTransport, RecordingTransport]:
+    """A new transport, recording traffic if the config asks for it.
+
+    Caps requests in flight at battle_max_concurrent_requests unless told otherwise.
+    """
+    transport = HttpTransport(
+        max_concurrent_requests=max_concurrent_requests or DEFAULT_CONFIG.battle_max_concurrent_requests)
+    if DEFAULT_CONFIG.battle_record_file:
+        return RecordingTransport(transport, DEFAULT_CONFIG.battle_record_file)
+    return transport
+
+
+def load_keys(path: str = 'battle_keys.json') -> dict[str, str]:
+    """Load the access/refresh tokens written by battle_key.py."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class AsyncBattleClient:
+    """Async HTTP client for Crabada battle game.
+
+    Every request goes through an HttpTransport; share one transport between clients
+    to share the connection pool. Requests are paced by the rate limiter, which waits
+    for capacity rather than failing.
+
+    List reads are served from a short-lived cache when possible; mutations invalidate
+    the cached reads they affect. Identical list reads made at the same time share one
+    request; pass the same SingleFlight to several clients to share across them too.
+
+    Transient failures are retried per the RetryPolicy, and endpoints that keep failing
+    are cut off for a while by their circuit breaker (shared by every client by default).
+    """
+
+    def __init__(self, access_token: str = '', refresh_token: str = '',
+                 transport: Optional[HttpTransport] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 batch_feed_path: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 breakers: Optional[CircuitBreakers] = None,
+                 flights: Optional[SingleFlight] = None):
+        # All battle api requests go here; point it at a mock server for testing.
+        self.base_url = base_url or DEFAULT_CONFIG.battle_api_url
+        # Required for all requests; setting it rebuilds the auth headers.
+        self.access_token = access_token
         # Currently unused. Haven't seen the BG refresh a token.
-        self.refresh_token = ''
-        # Generally we have keys unless we're going to sign in for the first time.
-        if expect_keys:
-            with open('battle_keys.json', 'r') as f:
-                keys = json.load(f)
-            self.access_token = keys['access_token']
-            self.refresh_token = keys['refresh_token']
-
-    def get_login_code(self, email_address: str) -> dict[str, Any]:
+        self.refresh_token = refresh_token
+        self.transport = transport or default_transport()
+        self.rate_limiter = rate_limiter or default_rate_limiter()
+        self.cache = cache or ResponseCache()
+        self.retry_policy = retry_policy or default_retry_policy()
+        self.breakers = breakers or DEFAULT_BREAKERS
+        self.flights = flights or SingleFlight()
+        # Multi-crab feed endpoint; empty if there isn't one (or it stopped working).
+        self.batch_feed_path = DEFAULT_CONFIG.battle_batch_feed_path if batch_feed_path is None else batch_feed_path
+
+    async def get_login_code(self, email_address: str) -> dict[str, Any]:
         """Request that a login code be sent to the email."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/public/sub-user/get-login-code'
+        url = self.base_url + '/crabada-user/public/sub-user/get-login-code'
         params = {'email_address': email_address}
-        return self.api_request(url, params=params, auth=False)
+        return await self.api_request(url, params=params, auth=False)
 
-    def login(self, email_address: str, code: str) -> LoginInfo:
+    async def login(self, email_address: str, code: str) -> LoginInfo:
         """Login with email/code and get back the auth tokens."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/public/sub-user/login'
+        url = self.base_url + '/crabada-user/public/sub-user/login'
         params = {
             'email_address': email_address,
             'code': code,
         }
-        return LoginInfo.convert(self.api_post(url, json_data=params, auth=False))
+        return LoginInfo.convert(await self.api_post(url, json_data=params, auth=False))
 
-    def list_my_open_mines(self, node_id: int) -> list[MineInfo]:
+    async def list_my_open_mines(self, node_id: int) -> list[MineInfo]:
         """Get a list of mines opened. Probably no reason not to use 0 here."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/campaign/mine-zones/mine/open/miner'
+        url = self.base_url + '/crabada-user/private/campaign/mine-zones/mine/open/miner'
         params = {
             # 0 gets results for all nodes
             # 5 is the lowest viable node
             'node_id': node_id,
         }
-        return convert_list(MineInfo.convert, self.api_request_list(url, params))
+        return await self.cached_list(url, params, MineInfo.convert)
 
-    def list_my_open_loots(self, node_id: int) -> list[MineInfo]:
+    async def list_my_open_loots(self, node_id: int) -> list[MineInfo]:
         """Get a list of loots opened. Probably no reason not to use 0 here."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/campaign/mine-zones/mine/active/looting'
+        url = self.base_url + '/crabada-user/private/campaign/mine-zones/mine/active/looting'
         params = {'node_id': node_id}
-        return convert_list(MineInfo.convert, self.api_request_list(url, params))
+        return await self.cached_list(url, params, MineInfo.convert)
 
-    def list_available_crabs(self) -> list[CrabadaData]:
+    async def list_available_crabs(self) -> list[CrabadaData]:
         """This will list crabs that can be used for mining/looting.
 
         I thought it only returns viable crabs (fed/energy) but maybe not?
         Apparently also returns crabs that are still in a mine/loot if finished but not claimed.
         Called whenever you are prompted to pick crabs for a loot/mine.
         """
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/crabada/mine'
-        return convert_list(CrabadaData.convert, self.api_request_list(url, {}))
+        url = self.base_url + '/crabada-user/private/crabada/mine'
+        return await self.cached_list(url, {}, CrabadaData.convert)
 
-    def money(self) -> list[MoneyItem]:
+    async def money(self) -> list[MoneyItem]:
         """Details about tus/cra/shell balances"""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/money/info'
-        return convert_list(MoneyItem.convert, self.api_request_list(url, {}))
+        url = self.base_url + '/crabada-user/private/money/info'
+        return await self.cached_list(url, {}, MoneyItem.convert)
 
-    def inventory(self) -> list[InventoryItem]:
+    async def inventory(self) -> list[InventoryItem]:
         """Details about materials and food. Pack into an InventorySummary for convenience."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/inventory/info'
-        return convert_list(InventoryItem.convert, self.api_request_list(url, {}))
+        url = self.base_url + '/crabada-user/private/inventory/info'
+        return await self.cached_list(url, {}, InventoryItem.convert)
 
-    def sync(self) -> list[CrabadaData]:
+    async def sync(self) -> list[CrabadaData]:
         """Returns details about all crabs.
 
         This is called whenever you go into the crabada view that lets you feed/level crabs.
         """
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/sync'
-        return convert_list(CrabadaData.convert, self.api_request_list(url, {}))
+        url = self.base_url + '/crabada-user/private/sync'
+        return await self.cached_list(url, {}, CrabadaData.convert)
 
-    def list_mine_zones(self) -> list[MineZoneInfo]:
+    async def list_mine_zones(self) -> list[MineZoneInfo]:
         """Returns all mining zones, useful for determining what nodes you have access to.
 
         Called whenever you go into the mine/loot page.
         """
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/campaign/all/mine-zones'
-        return convert_list(MineZoneInfo.convert, self.api_request_list(url, {}))
+        url = self.base_url + '/crabada-user/private/campaign/all/mine-zones'
+        return await self.cached_list(url, {}, MineZoneInfo.convert)
 
-    def start_mine(self, node_id: int,
-                   crab1: int, crab1p: str,
-                   crab2: int, crab2p: str,
-                   crab3: int, crab3p: str) -> MineInfo:
+    async def start_mine(self, node_id: int,
+                         crab1: int, crab1p: str,
+                         crab2: int, crab2p: str,
+                         crab3: int, crab3p: str) -> MineInfo:
         """Start a mine in a node with the given crabs and their position.
 
         Positions values are 1/2 (front/back) and 1/2/3 (top/middle/bottom), e.g.:
           21: rear top
           13: front bottom
         """
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/campaign/mine-zones/mine/create'
-        params = {
-            'node_id': node_id,
-            'crabada_id_1': crab1,
-            'crabada_id_2': crab2,
-            'crabada_id_3': crab3,
-            'p1': crab1p,
-            'p2': crab2p,
-            'p3': crab3p,
-        }
-        return MineInfo.convert(self.api_post(url, json_data=params))
+        return MineInfo.convert(await self.api_post_template(
+            START_MINE, node_id=node_id, crab1=crab1, crab2=crab2, crab3=crab3,
+            crab1p=crab1p, crab2p=crab2p, crab3p=crab3p))
 
-    def claim_mine(self, mine_id: int) -> dict[str, Any]:
+    async def claim_mine(self, mine_id: int) -> dict[str, Any]:
         """Claim a mine. Think the return type is a MineInfo."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/campaign/mine-zones/mine/claim'
-        params = {'mine_id': mine_id}
-        return self.api_post(url, json_data=params)
+        return await self.api_post_template(CLAIM_MINE, mine_id=mine_id)
 
-    def claim_loot(self, mine_id: int) -> dict[str, Any]:
+    async def claim_loot(self, mine_id: int) -> dict[str, Any]:
         """Claim a loot. Think the return type is a MineInfo."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/campaign/mine-zones/mine/looter-claim'
-        params = {'mine_id': mine_id}
-        return self.api_post(url, json_data=params)
+        return await self.api_post_template(CLAIM_LOOT, mine_id=mine_id)
 
-    def feed_crab(self, crabada_id: int, food_id: int) -> dict[str, Any]:
+    async def feed_crab(self, crabada_id: int, food_id: int) -> dict[str, Any]:
         """Feed a crab. Think the return type is a CrabadaInfo."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/crabada/eat'
+        return await self.api_post_template(FEED_CRAB, crabada_id=crabada_id, food_id=food_id)
+
+    def supports_batch_feed(self) -> bool:
+        return bool(self.batch_feed_path)
+
+    async def feed_crabs(self, crabada_ids: list[int], food_id: int) -> list[Any]:
+        """Feed several crabs in one request, using the configured batch endpoint.
+
+        Expected to return the fed crabs in request order, like feed_crab does for one.
+        If the failure says the endpoint doesn't exist or doesn't work (the API rejected the
+        request, or a 404/405), supports_batch_feed() goes false for good; either way callers
+        fall back to feed_crab for this batch.
+        """
+        url = self.base_url + self.batch_feed_path
         params = {
-            'crabada_id': crabada_id,
+            'crabada_ids': crabada_ids,
             'food_id': food_id,
         }
-        return self.api_post(url, json_data=params)
-
-    def craft_lv1_food(self, amount: int):
+        try:
+            return await self.api_post(url, json_data=params)
+        except (ApiError, aiohttp.ClientResponseError) as ex:
+            if isinstance(ex, ApiError) and not self.retry_policy.is_transient(ex) \
+                    or isinstance(ex, aiohttp.ClientResponseError) and ex.status in (404, 405):
+                logger.warning('Batch feed endpoint %s looks broken, not using it again: %s',
+                               self.batch_feed_path, ex)
+                self.batch_feed_path = ''
+            raise
+        finally:
+            # Same reads as a single feed go stale.
+            self.invalidate_for(FEED_CRAB.path)
+
+    async def craft_lv1_food(self, amount: int):
         """Craft a sandwich.
 
         There are other kinds of food that can be crafted but I'm only implementing this one.
         All mining/looting happens in zone 1 / node 5 generally anyway.
         """
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/crafting/money-food'
-        params = {
-            'recipe_id': 6,
-            'output_id': InventoryItem.SANDWICH_ID,
-            'amount': amount,
-            'material_1_id': InventoryItem.FLAG_ID,
-            'material_1_amount': amount,
-            'material_2_id': InventoryItem.FLORAL_ID,
-            'material_2_amount': amount,
-            'material_3_id': InventoryItem.CORAL_ID,
-            'material_3_amount': amount,
-            'material_4_id': InventoryItem.OCTO_ID,
-            'material_4_amount': amount,
-            'material_5_id': InventoryItem.TENTACRA_ID,
-            'material_5_amount': amount,
-        }
-        return self.api_post(url, json_data=params)
+        return await self.api_post_template(CRAFT_LV1_FOOD, amount=amount)
 
-    def craft_lv1_tus(self, amount: int):
+    async def craft_lv1_tus(self, amount: int):
         """Craft TUS from the level 1 ingredients."""
-        url = BattleClient.BATTLE_URL + '/crabada-user/private/crafting/money-food'
-        params = {
-            'recipe_id': 1,
-            'output_id': 1,
-            'amount': amount,
-            'material_1_id': InventoryItem.FLAG_ID,
-            'material_1_amount': amount,
-            'material_2_id': InventoryItem.FLORAL_ID,
-            'material_2_amount': amount,
-            'material_3_id': InventoryItem.CORAL_ID,
-            'material_3_amount': amount,
-            'material_4_id': InventoryItem.OCTO_ID,
-            'material_4_amount': amount,
-            'material_5_id': InventoryItem.TENTACRA_ID,
-            'material_5_amount': amount,
-        }
-        return self.api_post(url, json_data=params)
+        return await self.api_post_template(CRAFT_LV1_TUS, amount=amount)
 
-    def api_post(self, url: str, json_data: dict, auth: bool = True) -> dict[str, Any]:
+    async def api_post(self, url: str, json_data: dict, auth: bool = True) -> dict[str, Any]:
         """Mutating requests use this."""
-        # Needs auth for everything except login
-        return self._api_request(url, json_data, auth=auth, checksum=True, request_type='POST')
-
-    def api_request(self, url: str, params: dict, auth: bool = True) -> dict[str, Any]:
+        try:
+            # Needs auth for everything except login
+            return await self._api_request(url, json_data, auth=auth, checksum=True, request_type='POST')
+        finally:
+            # Even a failed mutation may have changed something server side.
+            self.invalidate_for(urlparse(url).path)
+
+    async def api_post_template(self, template: RequestTemplate, **values: Any) -> dict[str, Any]:
+        """Mutating requests with a prebuilt template use this; values fill in its Fields."""
+        try:
+            return await self._api_request(self.base_url + template.path, None, checksum=True,
+                                           request_type='POST', body=template.render(**values))
+        finally:
+            self.invalidate_for(template.path)
+
+    async def api_request(self, url: str, params: dict, auth: bool = True) -> dict[str, Any]:
         """Non-mutating requests for a single item use this."""
-        return self._api_request(url, params, auth=auth)
+        return await self._api_request(url, params, auth=auth)
 
-    def api_request_list(self, url: str, params: dict, auth: bool = True) -> list[dict[str, Any]]:
+    async def api_request_list(self, url: str, params: dict, auth: bool = True) -> list[dict[str, Any]]:
         """Non-mutating requests for a list of items use this."""
-        return self._api_request(url, params, auth=auth)
+        return await self._api_request(url, params, auth=auth)
 
-    def _api_request(self, url: str, params: dict, auth: bool = True, checksum: bool = False,
-                     request_type: str = 'GET') -> Union[list[dict[str, Any]], dict[str, Any]]:
-        """Send a Battle Game API Request.
+    async def cached_list(self, url: str, params: dict, convert_fn) -> list:
+        """Fetch and convert a list, or reuse a fresh enough converted copy.
+
+        If the same list is already being fetched, waits for that instead of fetching again.
+        Callers get their own list so they can shuffle/pop it, but the items are shared.
+        """
+        path = urlparse(url).path
+        result = self.cache.get(path, params)
+        if result is None:
+            generation = self.cache.generation(path)
+
+            async def fetch() -> list:
+                fetched = convert_list(convert_fn, await self.api_request_list(url, params))
+                # Dropped if a mutation invalidated the path while we were waiting on the API.
+                self.cache.put(path, params, fetched, generation)
+                return fetched
+
+            # Keyed by token too, since the flights may be shared with other accounts' clients.
+            # The generation means a read started before a mutation isn't shared with callers
+            # that come after it; they get a fresh read of their own.
+            key = (self.access_token, path, ResponseCache.key(params), generation)
+            if self.flights.in_flight(key):
+                READS_SHARED.inc(endpoint=path)
+            result = await self.flights.do(key, fetch)
+        return list(result)
+
+    def invalidate_for(self, mutation_path: str):
+        """Forget cached and in-flight reads that the mutation might have changed."""
+        self.cache.invalidate_for(mutation_path)
+        # The generation in the key covers this client; this covers other clients for the same
+        # account sharing the flights. Other accounts' reads aren't affected.
+        self.flights.forget_paths(self.access_token, self.cache.invalidations.get(mutation_path, []))
+
+    @property
+    def access_token(self) -> str:
+        return self._access_token
+
+    @access_token.setter
+    def access_token(self, access_token: str):
+        self._access_token = access_token
+        # Built once per token rather than on every request.
+        auth = {'Authorization': f'Bearer {access_token}'}
+        self._auth_headers = {**DEFAULT_HEADERS, **auth}
+        self._auth_post_headers = {**DEFAULT_POST_HEADERS, **auth}
+
+    async def _api_request(self, url: str, params: Optional[dict], auth: bool = True, checksum: bool = False,
+                           request_type: str = 'GET',
+                           body: Optional[bytes] = None) -> Union[list[dict[str, Any]], dict[str, Any]]:
+        """Send a Battle Game API Request, retrying transient failures the policy allows.
+
+        Raises CircuitOpenError without sending anything if the endpoint's circuit is open.
+        """
+        endpoint = urlparse(url).path
+        breaker = self.breakers.get(endpoint)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                CIRCUIT_REJECTED.inc(endpoint=endpoint)
+                retry_in = breaker.retry_at() - time.monotonic()
+                raise CircuitOpenError(f'{endpoint} keeps failing; not sending requests for {retry_in:.0f}s')
+            attempt += 1
+            try:
+                result = await self._send(url, params, auth, checksum, request_type, body)
+            except Exception as ex:
+                if not self.retry_policy.is_transient(ex):
+                    if isinstance(ex, ApiError):
+                        # The API is fine, it just didn't like this request.
+                        breaker.record_success()
+                    # Anything else says nothing either way about the API's health.
+                    raise
+                if breaker.record_failure():
+                    CIRCUIT_OPENED.inc(endpoint=endpoint)
+                    logger.warning('Circuit opened for %s after %d failures', endpoint, breaker.failures)
+                if not self.retry_policy.should_retry(ex, request_type, endpoint, attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logger.warning('Retrying %s %s in %.1fs after attempt %d failed: %s',
+                               request_type, endpoint, delay, attempt, ex)
+                API_RETRIES.inc(endpoint=endpoint)
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    async def _send(self, url: str, params: Optional[dict], auth: bool, checksum: bool, request_type: str,
+                    body: Optional[bytes]) -> Union[list[dict[str, Any]], dict[str, Any]]:
+        """Send one attempt of a request.
 
         Always uses the standard headers.
         Generally sets the auth header (except for login requests).
-        Sets the hash header on mutations.
+        Sets the hash header on mutations, over `body` if it's already serialized.
+        Waits on the rate limiter for the request's class first.
         """
-        final_headers = DEFAULT_HEADERS.copy()
-        if auth:
-            if not self.access_token:
-                raise Exception('Attempted to make an authorized request before authz was set up')
-            final_headers['Authorization'] = f'Bearer {self.access_token}'
-
-        if request_type == 'GET':
-            resp = requests.request(request_type, url, params=params, headers=final_headers, timeout=8).json()
-        elif request_type == 'POST' and checksum:
-            data = json.dumps(params, separators=(',', ':'))
-            final_headers['Hash'] = crabada_checksum(data)
-            final_headers['Content-Type'] = 'application/json'
-            resp = requests.request(request_type, url, data=data, headers=final_headers, timeout=8).json()
-        else:
-            resp = requests.request(request_type, url, json=params, headers=final_headers, timeout=8).json()
+        await self.rate_limiter.acquire(READ if request_type == 'GET' else MUTATION)
+
+        if auth and not self.access_token:
+            raise Exception('Attempted to make an authorized request before authz was set up')
+
+        endpoint = urlparse(url).path
+        start = time.perf_counter()
+        try:
+            if request_type == 'GET':
+                headers = self._auth_headers if auth else DEFAULT_HEADERS
+                resp = await self.transport.request(request_type, url, params=params, headers=headers)
+            elif request_type == 'POST' and checksum:
+                data = body if body is not None else dumps(params)
+                headers = dict(self._auth_post_headers if auth else DEFAULT_POST_HEADERS)
+                headers['Hash'] = crabada_checksum(data)
+                resp = await self.transport.request(request_type, url, data=data, headers=headers)
+            else:
+                headers = self._auth_headers if auth else DEFAULT_HEADERS
+                resp = await self.transport.request(request_type, url, json_data=params, headers=headers)
+        except Exception as ex:
+            API_ERRORS.inc(endpoint=endpoint, error_code=type(ex).__name__)
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - start, method=request_type, endpoint=endpoint)
+        if not isinstance(resp, dict) or 'error_code' not in resp:
+            API_ERRORS.inc(endpoint=endpoint, error_code='BAD_RESPONSE')
+            raise ApiError('BAD_RESPONSE', f'Not an API response: {str(resp)[:200]}')
         error = resp['error_code']
-        if resp['error_code']:
-            raise Exception('API Request failed:', error, '->', resp['message'])
+        if error:
+            API_ERRORS.inc(endpoint=endpoint, error_code=error)
+            raise ApiError(error, resp['message'])
         return resp['result']
 
+    async def close(self):
+        await self.transport.close()
+
+
+class BattleClient:
+    """Blocking wrapper around AsyncBattleClient.
+
+    Runs each call to completion on a private event loop. Don't use this from inside
+    a coroutine; await the AsyncBattleClient directly instead.
+    """
+
+    def __init__(self, expect_keys=True):
+        access_token, refresh_token = '', ''
+        # Generally we have keys unless we're going to sign in for the first time.
+        if expect_keys:
+            keys = load_keys()
+            access_token = keys['access_token']
+            refresh_token = keys['refresh_token']
+        self.client = AsyncBattleClient(access_token, refresh_token)
+        self._loop = asyncio.new_event_loop()
+
+    @property
+    def access_token(self) -> str:
+        return self.client.access_token
+
+    @property
+    def refresh_token(self) -> str:
+        return self.client.refresh_token
+
+    def _run(self, coro):
+        return self._loop.run_until_complete(coro)
+
+    def get_login_code(self, email_address: str) -> dict[str, Any]:
+        return self._run(self.client.get_login_code(email_address))
+
+    def login(self, email_address: str, code: str) -> LoginInfo:
+        return self._run(self.client.login(email_address, code))
+
+    def list_my_open_mines(self, node_id: int) -> list[MineInfo]:
+        return self._run(self.client.list_my_open_mines(node_id))
+
+    def list_my_open_loots(self, node_id: int) -> list[MineInfo]:
+        return self._run(self.client.list_my_open_loots(node_id))
+
+    def list_available_crabs(self) -> list[CrabadaData]:
+        return self._run(self.client.list_available_crabs())
+
+    def money(self) -> list[MoneyItem]:
+        return self._run(self.client.money())
+
+    def inventory(self) -> list[InventoryItem]:
+        return self._run(self.client.inventory())
+
+    def sync(self) -> list[CrabadaData]:
+        return self._run(self.client.sync())
+
+    def list_mine_zones(self) -> list[MineZoneInfo]:
+        return self._run(self.client.list_mine_zones())
+
+    def start_mine(self, node_id: int,
+                   crab1: int, crab1p: str,
+                   crab2: int, crab2p: str,
+                   crab3: int, crab3p: str) -> MineInfo:
+        return self._run(self.client.start_mine(node_id, crab1, crab1p, crab2, crab2p, crab3, crab3p))
+
+    def claim_mine(self, mine_id: int) -> dict[str, Any]:
+        return self._run(self.client.claim_mine(mine_id))
+
+    def claim_loot(self, mine_id: int) -> dict[str, Any]:
+        return self._run(self.client.claim_loot(mine_id))
+
+    def feed_crab(self, crabada_id: int, food_id: int) -> dict[str, Any]:
+        return self._run(self.client.feed_crab(crabada_id, food_id))
+
+    def feed_crabs(self, crabada_ids: list[int], food_id: int) -> list[Any]:
+        return self._run(self.client.feed_crabs(crabada_ids, food_id))
+
+    def craft_lv1_food(self, amount: int):
+        return self._run(self.client.craft_lv1_food(amount))
+
+    def craft_lv1_tus(self, amount: int):
+        return self._run(self.client.craft_lv1_tus(amount))
+
+    def close(self):
+        self._run(self.client.close())
+        self._loop.close()
+
 
 def convert_list(convert_fn, res) -> list:
     res = res or []
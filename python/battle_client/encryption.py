@@ -1,31 +1,79 @@
 import base64
 import hashlib
+from typing import Union
 
+from cachetools import LRUCache
 from Crypto.Cipher import AES
 
 CRABADA_AES_KEY = 'uPrwNC7WZr9vEYMGv1pnkeQuogTY8t6P'.encode('utf-8')
 CRABADA_AES_IV = 'BJcmqPomKAYdbfIi'.encode('utf-8')
 
+# Distinct request bodies to remember checksums for. Bodies are small, so this is cheap.
+DEFAULT_MEMO_SIZE = 4096
 
-def crabada_checksum(plain_text: str) -> str:
+
+class ChecksumEngine(object):
+    """Computes Hash header values, remembering the ones it has already computed.
+
+    The checksum only depends on the body, and the bot sends the same bodies over and
+    over (the same craft amounts, retries of the same claim), so most requests skip the
+    AES/base64/MD5 work entirely.
+    """
+
+    def __init__(self, memo_size: int = DEFAULT_MEMO_SIZE):
+        self._memo = LRUCache(maxsize=memo_size)
+        self.hits = 0
+        self.misses = 0
+
+    def checksum(self, body: Union[str, bytes]) -> str:
+        """Checksum for a serialized request body."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        result = self._memo.get(body)
+        if result is None:
+            self.misses += 1
+            result = compute_checksum(body)
+            self._memo[body] = result
+        else:
+            self.hits += 1
+        return result
+
+    def summary(self) -> str:
+        return f'{self.hits} hits, {self.misses} misses'
+
+
+def compute_checksum(body: bytes) -> str:
     """Creates a text string used in the Hash header value from the body of the request."""
     # Encryptor must be generated fresh each time.
     encryptor = AES.new(CRABADA_AES_KEY, AES.MODE_CBC, CRABADA_AES_IV)
     # Text must be padded for use with CBC.
-    padded_text = pad_for_cbc(plain_text, encryptor.block_size)
+    padded_body = pad_for_cbc(body, encryptor.block_size)
     # Encrypt dat.
-    encrypted_text = encryptor.encrypt(padded_text.encode('utf-8'))
+    encrypted_body = encryptor.encrypt(padded_body)
     # Then convert to base64 for some reason.
-    base64_text = base64.b64encode(encrypted_text)
+    base64_body = base64.b64encode(encrypted_body)
     # Then MD5 it.
-    md5_text = hashlib.md5(base64_text)
+    md5_body = hashlib.md5(base64_body)
     # Result is the MD5 hash with all uppercase letters.
-    return md5_text.hexdigest().upper()
+    return md5_body.hexdigest().upper()
+
+
+def pad_for_cbc(b: bytes, bs: int) -> bytes:
+    """Prep plaintext for AES processing in CBC mode (PKCS#7 padding).
+
+    Pads the encoded bytes rather than the string, so non-ASCII bodies still come out
+    a multiple of the block size.
+    """
+    pad = bs - len(b) % bs
+    return b + bytes([pad]) * pad
+
+
+DEFAULT_CHECKSUM_ENGINE = ChecksumEngine()
 
 
-def pad_for_cbc(s: str, bs: int) -> str:
-    """Prep plaintext for AES processing in CBC mode."""
-    return s + (bs - len(s) % bs) * chr(bs - len(s) % bs)
+def crabada_checksum(plain_text: Union[str, bytes]) -> str:
+    """Checksum for a request body, memoized in the shared engine."""
+    return DEFAULT_CHECKSUM_ENGINE.checksum(plain_text)
 
 
 if __name__ == '__main__':
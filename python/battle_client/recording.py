@@ -0,0 +1,148 @@
+import gzip
+import json
+import time
+from collections import deque
+from typing import Any, Iterator, Optional, Union
+from urllib.parse import urlparse
+
+from battle_client.transport import HttpTransport
+
+RECORDING_VERSION = 1
+
+# Values that identify or authenticate the account; never written to a recording.
+REDACTED_KEYS = frozenset(['access_token', 'refresh_token', 'email_address', 'code'])
+REDACTED = '<redacted>'
+
+# Unix timestamps in responses, shifted on replay so mines finish as they did when recorded.
+TIME_KEYS = frozenset(['start_time', 'end_time', 'attack_time', 'reset_time'])
+
+
+def redact(data: Any) -> Any:
+    """Copy of data with every REDACTED_KEYS value replaced, at any depth."""
+    if isinstance(data, dict):
+        return {k: REDACTED if k in REDACTED_KEYS else redact(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [redact(v) for v in data]
+    return data
+
+
+def shift_times(data: Any, offset: int) -> Any:
+    """Copy of data with every (set) TIME_KEYS value moved by offset seconds."""
+    if isinstance(data, dict):
+        return {k: v + offset if k in TIME_KEYS and isinstance(v, int) and v else shift_times(v, offset)
+                for k, v in data.items()}
+    if isinstance(data, list):
+        return [shift_times(v, offset) for v in data]
+    return data
+
+
+def request_args(params: Optional[dict], data: Optional[Union[str, bytes]], json_data: Optional[dict]) -> Any:
+    """Whatever the request sent (query params or body), as JSON data with secrets removed."""
+    if data is not None:
+        return redact(json.loads(data))
+    if json_data is not None:
+        return redact(json_data)
+    return redact(params or {})
+
+
+def request_key(method: str, url: str, args: Any) -> str:
+    return f'{method} {urlparse(url).path} {json.dumps(args, sort_keys=True, separators=(",", ":"))}'
+
+
+class RecordingTransport(object):
+    """Transport wrapper that logs every request and response to a gzipped JSON lines file.
+
+    Headers aren't recorded at all, and token/login fields are redacted, so a recording
+    can be shared. The first line is a header with the time recording started.
+    """
+
+    def __init__(self, transport: HttpTransport, path: str):
+        self.transport = transport
+        self.path = path
+        self.started_at = time.time()
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._write({'version': RECORDING_VERSION, 'started_at': self.started_at})
+
+    def _write(self, record: dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        # The bot usually runs until killed, so don't leave records sitting in the buffer.
+        self._file.flush()
+
+    async def request(self, method: str, url: str,
+                      params: Optional[dict] = None,
+                      data: Optional[Union[str, bytes]] = None,
+                      json_data: Optional[dict] = None,
+                      headers: Optional[dict] = None) -> dict[str, Any]:
+        resp = await self.transport.request(method, url, params=params, data=data, json_data=json_data,
+                                            headers=headers)
+        self._write({
+            'at': round(time.time() - self.started_at, 3),
+            'method': method,
+            'path': urlparse(url).path,
+            'args': request_args(params, data, json_data),
+            'response': redact(resp),
+        })
+        return resp
+
+    async def close(self):
+        self._file.close()
+        await self.transport.close()
+
+
+def read_recording(path: str) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """The header and records from a recording."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    return lines[0], lines[1:]
+
+
+def recorded_results(path: str, path_suffix: str) -> Iterator[Any]:
+    """Every successful result recorded for endpoints ending with path_suffix."""
+    _, records = read_recording(path)
+    for record in records:
+        response = record['response']
+        if record['path'].endswith(path_suffix) and not response.get('error_code'):
+            yield response['result']
+
+
+class ReplayTransport(object):
+    """Serves the responses from a recording instead of talking to the API.
+
+    Requests are matched on method, path and arguments. Repeats of the same request get
+    the recorded responses in order, and the last one once those run out, so a replay
+    always sees the same data. Timestamps are moved forward by however long ago the
+    recording started, so mines are exactly as finished as they were then.
+    """
+
+    def __init__(self, path: str, shift_timestamps: bool = True):
+        header, records = read_recording(path)
+        self.recorded_at = header['started_at']
+        self.shift_timestamps = shift_timestamps
+        self._responses: dict[str, deque] = {}
+        for record in records:
+            key = request_key(record['method'], record['path'], record['args'])
+            self._responses.setdefault(key, deque()).append(record['response'])
+        self._offset: Optional[int] = None
+        self.unmatched = 0
+
+    async def request(self, method: str, url: str,
+                      params: Optional[dict] = None,
+                      data: Optional[Union[str, bytes]] = None,
+                      json_data: Optional[dict] = None,
+                      headers: Optional[dict] = None) -> dict[str, Any]:
+        key = request_key(method, url, request_args(params, data, json_data))
+        responses = self._responses.get(key)
+        if not responses:
+            self.unmatched += 1
+            raise Exception(f'No recorded response for {key}')
+        resp = responses.popleft() if len(responses) > 1 else responses[0]
+
+        if not self.shift_timestamps:
+            return resp
+        if self._offset is None:
+            # Pinned on the first request, so the whole replay shifts together.
+            self._offset = int(time.time() - self.recorded_at)
+        return shift_times(resp, self._offset)
+
+    async def close(self):
+        pass
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import random
+import time
+from typing import Iterable, Optional
+
+import aiohttp
+
+# error_codes meaning the API had a problem, not that the request was bad; trying again may work.
+TRANSIENT_ERROR_CODES = frozenset([
+    'INTERNAL_SERVER_ERROR',
+    'SERVICE_UNAVAILABLE',
+    'GATEWAY_TIMEOUT',
+    'TOO_MANY_REQUESTS',
+    # Our own code for a response that wasn't shaped like an API response.
+    'BAD_RESPONSE',
+])
+
+# HTTP statuses (from something in front of the API) worth trying again.
+TRANSIENT_HTTP_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# The subset of those that mean the request was turned away before anything happened, so
+# even a mutation that isn't safe to repeat can be sent again.
+REJECTED_ERROR_CODES = frozenset([
+    'SERVICE_UNAVAILABLE',
+    'TOO_MANY_REQUESTS',
+])
+
+# Mutations where sending the same request twice can't do anything twice (the repeat just
+# fails), so they can be retried even when we can't tell whether the first one landed.
+IDEMPOTENT_MUTATIONS = frozenset([
+    '/crabada-user/private/campaign/mine-zones/mine/claim',
+    '/crabada-user/private/campaign/mine-zones/mine/looter-claim',
+])
+
+# The request or its response got lost somewhere; we don't know if the API acted on it.
+# A JSON decode error means we got something other than an API response, like an error page.
+# Error statuses (aiohttp.ClientResponseError) are sorted out by TRANSIENT_HTTP_STATUSES.
+TRANSPORT_ERRORS = (asyncio.TimeoutError, aiohttp.ClientError, json.JSONDecodeError)
+
+
+class ApiError(Exception):
+    """The API answered, with an error_code instead of a result."""
+
+    def __init__(self, error_code: str, message: str):
+        super().__init__('API Request failed:', error_code, '->', message)
+        self.error_code = error_code
+        self.message = message
+
+
+class CircuitOpenError(Exception):
+    """Not sent, because the endpoint has been failing; see CircuitBreaker."""
+
+
+class RetryPolicy(object):
+    """Decides which failed requests to try again, and how long to wait first.
+
+    Reads are retried on any transient failure. Mutations are only retried when a repeat
+    can't double up: the API rejected them outright, or the endpoint is idempotent.
+    Waits back off exponentially with full jitter, so accounts that failed together
+    don't all retry together.
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay_sec: float = .5,
+                 max_delay_sec: float = 8,
+                 idempotent_mutations: Iterable[str] = IDEMPOTENT_MUTATIONS):
+        self.max_attempts = max_attempts
+        self.base_delay_sec = base_delay_sec
+        self.max_delay_sec = max_delay_sec
+        self.idempotent_mutations = frozenset(idempotent_mutations)
+
+    @staticmethod
+    def is_transient(ex: Exception) -> bool:
+        """Whether a failure says something about the API's health (vs. the request itself)."""
+        if isinstance(ex, ApiError):
+            return ex.error_code in TRANSIENT_ERROR_CODES
+        if isinstance(ex, aiohttp.ClientResponseError):
+            return ex.status in TRANSIENT_HTTP_STATUSES
+        return isinstance(ex, TRANSPORT_ERRORS)
+
+    def should_retry(self, ex: Exception, method: str, path: str, attempt: int) -> bool:
+        """Whether to try again after `attempt` (1 for the first) failed attempts."""
+        if attempt >= self.max_attempts or not self.is_transient(ex):
+            return False
+        if method == 'GET' or path in self.idempotent_mutations:
+            return True
+        return isinstance(ex, ApiError) and ex.error_code in REJECTED_ERROR_CODES
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay_sec, self.base_delay_sec * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker(object):
+    """Stops requests to an endpoint that keeps failing, so we don't hammer the API in an outage.
+
+    After failure_threshold transient failures in a row the circuit opens and requests fail
+    fast. Once reset_sec has passed, one trial request is let through: success closes the
+    circuit, failure keeps it open for another reset_sec.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_sec: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_sec = reset_sec
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # When the current trial request went out; a trial that never reports back expires.
+        self._trial_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_sec else 'open'
+
+    def retry_at(self) -> float:
+        """Monotonic time the next trial request is allowed."""
+        return (self.opened_at or 0) + self.reset_sec
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now < self.retry_at():
+            return False
+        if self._trial_at is not None and now - self._trial_at < self.reset_sec:
+            # Someone else's trial is still in flight.
+            return False
+        self._trial_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None
+
+    def record_failure(self) -> bool:
+        """Count a transient failure; returns True if this opened (or re-opened) the circuit."""
+        self.failures += 1
+        self._trial_at = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class CircuitBreakers(object):
+    """A CircuitBreaker per endpoint path, created on first use."""
+
+    def __init__(self, failure_threshold: int = 5, reset_sec: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_sec = reset_sec
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, path: str) -> CircuitBreaker:
+        breaker = self.breakers.get(path)
+        if breaker is None:
+            breaker = self.breakers[path] = CircuitBreaker(self.failure_threshold, self.reset_sec)
+        return breaker
+
+    def summary(self) -> str:
+        tripped = [f'{path}: {b.state}' for path, b in self.breakers.items() if b.state != 'closed']
+        return ' | '.join(tripped) or 'all closed'
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+
+class SingleFlight(object):
+    """Lets concurrent identical reads share one request.
+
+    The first caller for a key starts the work; anyone asking for the same key before it
+    finishes waits on that instead of sending their own request, and gets the same result
+    (or exception). Nothing is kept once the work finishes; that's the ResponseCache's job.
+
+    The work runs as its own task, so a caller being cancelled doesn't cancel it for the
+    others waiting on it.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            self.started += 1
+            flight = asyncio.ensure_future(fn())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda f: self._landed(key, f))
+        else:
+            self.shared += 1
+        return await asyncio.shield(flight)
+
+    def _landed(self, key: Hashable, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Mark the exception as seen even if every caller was cancelled before it came back.
+            flight.exception()
+
+    def forget(self, matches: Callable[[Hashable], bool]):
+        """Stop sharing in-flight work for matching keys; later callers start over.
+
+        For when something (like a mutation) may have made the in-flight result stale.
+        """
+        for key in [key for key in self._flights if matches(key)]:
+            del self._flights[key]
+
+    def forget_paths(self, token: str, paths: Iterable[str]):
+        """forget() one account's reads, for keys of the form (token, path, ...)."""
+        paths = set(paths)
+        if paths:
+            self.forget(lambda key: key[0] == token and key[1] in paths)
+
+    def summary(self) -> str:
+        return f'{self.started} sent, {self.shared} shared'
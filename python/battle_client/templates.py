@@ -0,0 +1,57 @@
+import json
+from typing import Any
+
+try:
+    # Optional; noticeably faster than json for bodies we can't template.
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """Compact JSON, the way the game client sends it."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+class Field(object):
+    """Placeholder for a value filled in per request."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class RequestTemplate(object):
+    """A mutation body with its static parts serialized once.
+
+    The body is given as a dict where per-request values are Fields; everything else is
+    serialized up front. render() then only has to serialize the Fields and join the
+    pieces, and produces exactly the bytes json.dumps would for the same dict.
+    """
+
+    def __init__(self, path: str, body: dict[str, Any]):
+        self.path = path
+        # Serialized text before each Field, then whatever follows the last one.
+        self._literals: list[bytes] = []
+        self._fields: list[str] = []
+        literal = '{'
+        for i, (key, value) in enumerate(body.items()):
+            literal += (',' if i else '') + json.dumps(key) + ':'
+            if isinstance(value, Field):
+                self._literals.append(literal.encode('utf-8'))
+                self._fields.append(value.name)
+                literal = ''
+            else:
+                literal += json.dumps(value, separators=(',', ':'))
+        self._literals.append((literal + '}').encode('utf-8'))
+
+    def render(self, **values: Any) -> bytes:
+        parts = []
+        for literal, name in zip(self._literals, self._fields):
+            parts.append(literal)
+            value = values[name]
+            # Ints are nearly everything we send; skip the serializer for them.
+            parts.append(str(value).encode('utf-8') if type(value) is int else dumps(value))
+        parts.append(self._literals[-1])
+        return b''.join(parts)
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from typing import Any, Optional, Union
+
+import aiohttp
+
+# Matches the timeout the blocking client used per request.
+DEFAULT_TIMEOUT_SEC = 8
+# Keep-alive connections kept open per host; only one host is used today.
+DEFAULT_CONNECTIONS_PER_HOST = 20
+# Cap on requests in flight at once across every client sharing the transport.
+DEFAULT_MAX_CONCURRENT_REQUESTS = 20
+
+
+class HttpTransport(object):
+    """Async HTTP transport backed by a single keep-alive connection pool.
+
+    The underlying connector pools connections per host, so every client that shares
+    a transport (e.g. all accounts in the process) reuses the same TLS connections.
+    The session is created lazily because aiohttp wants it built inside a running loop.
+    """
+
+    def __init__(self,
+                 timeout_sec: float = DEFAULT_TIMEOUT_SEC,
+                 connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST,
+                 max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS):
+        self.timeout_sec = timeout_sec
+        self.connections_per_host = connections_per_host
+        self.max_concurrent_requests = max_concurrent_requests
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Also created lazily so it binds to the loop that actually runs the requests.
+        self._request_slots: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.connections_per_host)
+            timeout = aiohttp.ClientTimeout(total=self.timeout_sec)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    def _get_request_slots(self) -> asyncio.Semaphore:
+        if self._request_slots is None:
+            self._request_slots = asyncio.Semaphore(self.max_concurrent_requests)
+        return self._request_slots
+
+    async def request(self, method: str, url: str,
+                      params: Optional[dict] = None,
+                      data: Optional[Union[str, bytes]] = None,
+                      json_data: Optional[dict] = None,
+                      headers: Optional[dict] = None) -> dict[str, Any]:
+        """Send a request and return the decoded JSON body.
+
+        Waits for a free request slot first if too many requests are already in flight.
+        Raises aiohttp.ClientResponseError for an error status, unless the body is an API
+        response (with an error_code) that the client can handle itself.
+        """
+        session = self._get_session()
+        async with self._get_request_slots():
+            async with session.request(method, url, params=params, data=data, json=json_data,
+                                       headers=headers) as resp:
+                # The API doesn't always set a JSON content type, so decode it ourselves.
+                raw = await resp.read()
+                if resp.status < 400:
+                    return self.decode(raw)
+                try:
+                    body = self.decode(raw)
+                except ValueError:
+                    body = None
+                if not isinstance(body, dict) or 'error_code' not in body:
+                    # Not the API answering, e.g. a gateway error page or an unknown path.
+                    resp.raise_for_status()
+                return body
+
+    def decode(self, raw: bytes) -> Any:
+        """Parse a response body; override to meter or swap out the JSON parsing."""
+        return json.loads(raw)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -1,14 +1,68 @@
 from __future__ import annotations
 
+import logging
 import math
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from typing import Any, Dict, Optional
 
 from dacite import from_dict
 
 from common.faction import CrabClass
 
+logger = logging.getLogger(__name__)
+
+# CrabClass(value) goes through the enum machinery; a dict lookup is much cheaper.
+CRAB_CLASS_BY_VALUE = {c.value: c for c in CrabClass}
+TANK_CLASSES = frozenset([CrabClass.BULK, CrabClass.SURGE, CrabClass.GEM])
+DPS_CLASSES = frozenset([CrabClass.PRIME, CrabClass.CRABOID, CrabClass.RUINED])
+SUP_CLASSES = frozenset([CrabClass.SUNKEN, CrabClass.ORGANIC])
+
+# The convert() functions below are hand-written because dacite's per-field type checking
+# is slow when decoding hundreds of mines/crabs. Strict mode decodes through dacite instead,
+# which validates every field; turn it on in tests or when the API changes shape.
+_strict_decoding = False
+
+
+def set_strict_decoding(strict: bool):
+    """If True, decode API payloads through dacite with full type validation."""
+    global _strict_decoding
+    _strict_decoding = strict
+
+
+def _optional(convert_fn, data: Optional[Dict[str, Any]]):
+    return None if data is None else convert_fn(data)
+
+
+def slotted(cls):
+    """Rebuild a dataclass with __slots__ instead of a per-instance __dict__.
+
+    Same idea as dataclass(slots=True), which needs Python 3.10. We keep tens of thousands
+    of crabs/mines alive when running many accounts, so the memory matters.
+    """
+    cls_dict = dict(cls.__dict__)
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict['__slots__'] = field_names
+    # Defaults (e.g. field(init=False)) would conflict with the slot descriptors.
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    if cls.__dataclass_params__.frozen:
+        # Without these, copy and pickle restore slots with setattr, which frozen classes refuse.
+        cls_dict['__getstate__'] = _slotted_getstate
+        cls_dict['__setstate__'] = _slotted_setstate
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+def _slotted_getstate(self) -> list:
+    return [getattr(self, f.name) for f in fields(self)]
+
+
+def _slotted_setstate(self, state: list):
+    for f, value in zip(fields(self), state):
+        object.__setattr__(self, f.name, value)
+
 
 @dataclass()
 class LoginInfo(object):
@@ -38,10 +92,20 @@ class LoginInfo(object):
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=LoginInfo, data=data)
-
-
-@dataclass()
+        if _strict_decoding:
+            return from_dict(data_class=LoginInfo, data=data)
+        return LoginInfo(
+            user_id=data['user_id'],
+            owner=data['owner'],
+            level=data['level'],
+            crabada_slots=data['crabada_slots'],
+            access_token=data['access_token'],
+            refresh_token=data['refresh_token'],
+        )
+
+
+@slotted
+@dataclass(frozen=True)
 class RewardInfo(object):
     """Details about rewards in a mine."""
     node_id: int  # 5
@@ -58,10 +122,17 @@ class RewardInfo(object):
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=RewardInfo, data=data)
+        if _strict_decoding:
+            return from_dict(data_class=RewardInfo, data=data)
+        return RewardInfo(
+            node_id=data['node_id'],
+            origin_item_id=data['origin_item_id'],
+            amount=data['amount'],
+        )
 
 
-@dataclass()
+@slotted
+@dataclass(frozen=True)
 class MineInfo(object):
     """Details about a mine."""
     mine_id: int  # 512199
@@ -95,8 +166,12 @@ class MineInfo(object):
         return time.time() > self.end_time
 
     def can_looter_claim(self) -> bool:
+        return time.time() > self.looter_claim_time()
+
+    def looter_claim_time(self) -> int:
+        """Unix time after which the looter can claim."""
         # Tiny bit of padding here.
-        return time.time() > self.attack_time + 31 * 60
+        return self.attack_time + 31 * 60
 
     def amount_for_mat(self, item_id: int) -> float:
         for item in self.rewards:
@@ -106,10 +181,27 @@ class MineInfo(object):
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=MineInfo, data=data)
-
-
-@dataclass()
+        if _strict_decoding:
+            return from_dict(data_class=MineInfo, data=data)
+        return MineInfo(
+            mine_id=data['mine_id'],
+            node_id=data['node_id'],
+            miner_id=data['miner_id'],
+            start_time=data['start_time'],
+            end_time=data['end_time'],
+            attack_time=data['attack_time'],
+            looter_id=data['looter_id'],
+            winner_id=data['winner_id'],
+            status=data['status'],
+            rewards=[RewardInfo.convert(r) for r in data['rewards']],
+            crabada_1_info=_optional(CrabadaData.convert, data.get('crabada_1_info')),
+            crabada_2_info=_optional(CrabadaData.convert, data.get('crabada_2_info')),
+            crabada_3_info=_optional(CrabadaData.convert, data.get('crabada_3_info')),
+        )
+
+
+@slotted
+@dataclass(frozen=True)
 class EnergyInfo(object):
     """Energy for the crabada and reset time."""
     energy: int  # 0-24
@@ -117,12 +209,22 @@ class EnergyInfo(object):
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=EnergyInfo, data=data)
+        if _strict_decoding:
+            return from_dict(data_class=EnergyInfo, data=data)
+        return EnergyInfo(
+            energy=data['energy'],
+            reset_time=data['reset_time'],
+        )
 
 
-@dataclass()
+@slotted
+@dataclass(frozen=True)
 class CrabadaData(object):
-    """Details about an individual crabada."""
+    """Details about an individual crabada.
+
+    Frozen so the derived values computed at decode time can't go stale; use
+    dataclasses.replace() to get an updated copy.
+    """
     crabada_id: int  # 12345
     # id: int  # 45678
     # user_id: int  # 3456
@@ -171,32 +273,48 @@ class CrabadaData(object):
     combat_power: int  # 4961
     energy: EnergyInfo
 
-    @property
-    def effective_level(self) -> int:
-        """Calculate the actual level of the crab based on hunger and max level."""
-        ratio = self.power_level / self.max_power_level
-        return max(int(math.ceil(ratio * self.max_level)), 1)
+    # Derived in __post_init__, since the bot checks these over and over.
+    # The actual level of the crab based on hunger and max level.
+    effective_level: int = field(init=False, compare=False)
+    max_level: int = field(init=False, compare=False)
+    _class_enum: CrabClass = field(init=False, repr=False, compare=False)
 
-    @property
-    def max_level(self) -> int:
+    def __post_init__(self):
         # Not clear why these are always the same, but compensate in case that changes.
-        return max(self.level, self.real_level)
+        max_level = max(self.level, self.real_level)
+        # One odd crab shouldn't fail decoding a whole listing; without a max it can't be hungry.
+        ratio = self.power_level / self.max_power_level if self.max_power_level else 1
+        # Frozen, so go around the generated __setattr__.
+        object.__setattr__(self, 'max_level', max_level)
+        object.__setattr__(self, 'effective_level', max(int(math.ceil(ratio * max_level)), 1))
+        object.__setattr__(self, '_class_enum', CRAB_CLASS_BY_VALUE[self.crabada_class])
 
-    def class_enum(self):
-        return CrabClass(self.crabada_class)
+    def class_enum(self) -> CrabClass:
+        return self._class_enum
 
     def is_tank(self):
-        return self.class_enum() in [CrabClass.BULK, CrabClass.SURGE, CrabClass.GEM]
+        return self._class_enum in TANK_CLASSES
 
     def is_dps(self):
-        return self.class_enum() in [CrabClass.PRIME, CrabClass.CRABOID, CrabClass.RUINED]
+        return self._class_enum in DPS_CLASSES
 
     def is_sup(self):
-        return self.class_enum() in [CrabClass.SUNKEN, CrabClass.ORGANIC]
+        return self._class_enum in SUP_CLASSES
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=CrabadaData, data=data)
+        if _strict_decoding:
+            return from_dict(data_class=CrabadaData, data=data)
+        return CrabadaData(
+            crabada_id=data['crabada_id'],
+            crabada_class=data['crabada_class'],
+            level=data['level'],
+            real_level=data['real_level'],
+            power_level=data['power_level'],
+            max_power_level=data['max_power_level'],
+            combat_power=data['combat_power'],
+            energy=EnergyInfo.convert(data['energy']),
+        )
 
 
 @dataclass()
@@ -216,7 +334,14 @@ class MoneyItem(object):
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=MoneyItem, data=data)
+        if _strict_decoding:
+            return from_dict(data_class=MoneyItem, data=data)
+        return MoneyItem(
+            origin_item_id=data['origin_item_id'],
+            amount=data['amount'],
+            user_id=data['user_id'],
+            item_name=data['item_name'],
+        )
 
 
 class MoneySummary(object):
@@ -273,14 +398,43 @@ class InventoryItem(object):
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=InventoryItem, data=data)
+        if _strict_decoding:
+            return from_dict(data_class=InventoryItem, data=data)
+        return InventoryItem(
+            origin_item_id=data['origin_item_id'],
+            amount=data['amount'],
+            item_name=data['item_name'],
+            item_description=data['item_description'],
+            level=data['level'],
+            experience=data['experience'],
+            durability=data['durability'],
+        )
+
+
+# Level 1 materials, one of each consumed per item by the level 1 food and TUS recipes.
+LV1_MATERIAL_IDS = [
+    InventoryItem.FLAG_ID,
+    InventoryItem.FLORAL_ID,
+    InventoryItem.CORAL_ID,
+    InventoryItem.OCTO_ID,
+    InventoryItem.TENTACRA_ID,
+]
 
 
 class InventorySummary(object):
     """Given a list of inventory, counts specific interesting materials and food."""
 
     def __init__(self, items: list[InventoryItem]):
-        data = {i.origin_item_id: i.amount for i in items}
+        self._load({i.origin_item_id: i.amount for i in items})
+
+    @staticmethod
+    def from_counts(data: Dict[int, int]) -> InventorySummary:
+        """Summarize an item id -> amount mapping instead of a list of items."""
+        summary = InventorySummary([])
+        summary._load(data)
+        return summary
+
+    def _load(self, data: Dict[int, int]):
         self.flag_count = data.get(InventoryItem.FLAG_ID, 0)
         self.floral_count = data.get(InventoryItem.FLORAL_ID, 0)
         self.coral_count = data.get(InventoryItem.CORAL_ID, 0)
@@ -301,8 +455,7 @@ class InventorySummary(object):
             (self.tentacra_count, InventoryItem.TENTACRA_ID),
         ]
         mats_and_counts.sort(key=lambda x: x[0])
-        print(mats_and_counts)
-        print('picking', mats_and_counts[0][1])
+        logger.debug('Material counts %s, picking %d', mats_and_counts, mats_and_counts[0][1])
         return mats_and_counts[0][1]
 
 
@@ -333,4 +486,11 @@ class MineZoneInfo(object):
 
     @staticmethod
     def convert(data: Dict[str, Any]):
-        return from_dict(data_class=MineZoneInfo, data=data)
+        if _strict_decoding:
+            return from_dict(data_class=MineZoneInfo, data=data)
+        return MineZoneInfo(
+            node_id=data['node_id'],
+            is_mine_zone=data['is_mine_zone'],
+            passed=data['passed'],
+            can_attack=data['can_attack'],
+        )
@@ -39,6 +39,7 @@ if not user_code.isdigit():
     exit(-1)
 
 result = client.login(user_email, user_code)
+client.close()
 output = {
     'access_token': result.access_token,
     'refresh_token': result.refresh_token,
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+#
+# Compares the original per-request Hash computation against the memoized ChecksumEngine,
+# on a mix of mutation bodies shaped like what the bot sends.
+# Run from the python directory: python -m benchmarks.bench_checksum
+
+import base64
+import hashlib
+import json
+import random
+import timeit
+
+from Crypto.Cipher import AES
+
+from battle_client.encryption import CRABADA_AES_IV, CRABADA_AES_KEY, ChecksumEngine, compute_checksum
+
+
+def original_checksum(plain_text: str) -> str:
+    """The checksum as it was computed before the engine: string padding, fresh cipher."""
+    encryptor = AES.new(CRABADA_AES_KEY, AES.MODE_CBC, CRABADA_AES_IV)
+    pad = encryptor.block_size - len(plain_text) % encryptor.block_size
+    encrypted_text = encryptor.encrypt((plain_text + pad * chr(pad)).encode('utf-8'))
+    return hashlib.md5(base64.b64encode(encrypted_text)).hexdigest().upper()
+
+
+def mutation_bodies(count: int, distinct_mines: int, seed: int = 0) -> list[str]:
+    """Claims, feeds and crafts; claims and feeds repeat across retries and cycles."""
+    rng = random.Random(seed)
+    mine_ids = [rng.randint(10_000_000, 99_999_999) for _ in range(distinct_mines)]
+    crab_ids = [rng.randint(10_000, 999_999) for _ in range(distinct_mines * 3)]
+    bodies = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.5:
+            body = {'mine_id': rng.choice(mine_ids)}
+        elif kind < 0.9:
+            body = {'crabada_id': rng.choice(crab_ids), 'food_id': 800001}
+        else:
+            body = {'recipe_id': 6, 'output_id': 800001, 'amount': rng.randint(1, 20)}
+        bodies.append(json.dumps(body, separators=(',', ':')))
+    return bodies
+
+
+def bench(name: str, bodies: list[str], repeat: int = 5):
+    expected = [original_checksum(b) for b in bodies]
+    if [compute_checksum(b.encode('utf-8')) for b in bodies] != expected:
+        raise Exception('Byte padding disagrees with the original checksum')
+
+    original_sec = min(timeit.repeat(lambda: [original_checksum(b) for b in bodies], number=1, repeat=repeat))
+    uncached_sec = min(timeit.repeat(lambda: [compute_checksum(b.encode('utf-8')) for b in bodies],
+                                     number=1, repeat=repeat))
+
+    # A fresh engine per run, so the memo only helps with repeats inside the batch.
+    def run_engine():
+        engine = ChecksumEngine()
+        return [engine.checksum(b) for b in bodies], engine
+
+    got, engine = run_engine()
+    if got != expected:
+        raise Exception('ChecksumEngine disagrees with the original checksum')
+    engine_sec = min(timeit.repeat(run_engine, number=1, repeat=repeat))
+
+    per_item = 1e6 / len(bodies)
+    print(f'{name:>16} x{len(bodies)}: original {original_sec * per_item:5.1f}us'
+          f'  bytes {uncached_sec * per_item:5.1f}us'
+          f'  memo {engine_sec * per_item:5.1f}us'
+          f'  ({original_sec / engine_sec:.1f}x, memo {engine.summary()})')
+
+
+def main():
+    bench('mostly repeats', mutation_bodies(5000, distinct_mines=50))
+    bench('mostly distinct', mutation_bodies(5000, distinct_mines=2000))
+
+
+if __name__ == '__main__':
+    main()
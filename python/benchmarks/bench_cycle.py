@@ -0,0 +1,317 @@
+#!/usr/bin/python
+#
+# Runs whole BattleManager cycles (do_action_loop) against the mock API, or a recording,
+# and measures where the time goes: wall time per phase, API calls, bytes on the wire,
+# CPU spent decoding and checksumming, and peak RSS.
+# Run from the python directory: python -m benchmarks.bench_cycle
+#
+#   --crabs 10 100 1000 10000 --accounts 1 10    sizes to run (every combination)
+#   --recording rec.jsonl.gz                     replay a RecordingTransport file instead
+#   --output results.json                        save the results
+#   --baseline results.json                      compare against earlier results
+#   --profile-dir profiles                       sample the first account's cycles (see CycleProfiler)
+#
+# Each size runs in a fresh process so peak RSS means something. The mock server runs in
+# this process, so it doesn't count against the bot's CPU or memory. Rate limits are off;
+# this measures the bot, not the throttle.
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import threading
+import time
+from typing import Any, Optional, Union
+
+import battle_client.client
+import battle_client.types
+from battle_client.client import AsyncBattleClient
+from battle_client.recording import ReplayTransport
+from battle_client.transport import HttpTransport
+from bots.battle import BattleManager
+from common.discord import AlertManager
+from common.logs import setup_logging
+from common.profiler import CycleProfiler
+from common.rate_limit import RateLimiter, TokenBucket
+from mock_api.game import GameSettings, MockGame
+from mock_api.server import MockBattleServer
+
+DECODED_TYPES = ['CrabadaData', 'MineInfo', 'MineZoneInfo', 'InventoryItem', 'MoneyItem']
+
+
+class MeteredTransport(HttpTransport):
+    """HttpTransport that counts calls and bytes, and times the JSON parsing itself.
+
+    Wraps the real request path rather than copying it, so what gets measured is what ships.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls: dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.json_cpu_sec = 0.0
+
+    async def request(self, method: str, url: str,
+                      params: Optional[dict] = None,
+                      data: Optional[Union[str, bytes]] = None,
+                      json_data: Optional[dict] = None,
+                      headers: Optional[dict] = None) -> dict[str, Any]:
+        endpoint = f'{method} {url.split("/private", 1)[-1]}'
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if data is not None:
+            self.bytes_sent += len(data)
+        return await super().request(method, url, params=params, data=data, json_data=json_data,
+                                     headers=headers)
+
+    def decode(self, raw: bytes) -> Any:
+        self.bytes_received += len(raw)
+        start = time.thread_time()
+        try:
+            return super().decode(raw)
+        finally:
+            self.json_cpu_sec += time.thread_time() - start
+
+
+class MeteredReplay(ReplayTransport):
+    """ReplayTransport that counts calls; there are no bytes to count."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.calls: dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.json_cpu_sec = 0.0
+
+    async def request(self, method: str, url: str, **kwargs) -> dict[str, Any]:
+        endpoint = f'{method} {url.split("/private", 1)[-1]}'
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        return await super().request(method, url, **kwargs)
+
+
+class CpuMeter(object):
+    """Accumulates CPU time spent in the response decoders and in the Hash checksum.
+
+    Swaps in timing wrappers for the duration of a `with` block. The client looks these
+    up at call time, so the wrappers see every call.
+    """
+
+    def __init__(self):
+        self.decode_sec = 0.0
+        self.checksum_sec = 0.0
+        self._restore: list[tuple[Any, str, Any]] = []
+
+    def _wrap(self, owner: Any, name: str, counter: str, wrap_static: bool):
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                setattr(self, counter, getattr(self, counter) + time.thread_time() - start)
+
+        self._restore.append((owner, name, owner.__dict__[name]))
+        setattr(owner, name, staticmethod(timed) if wrap_static else timed)
+
+    def __enter__(self) -> 'CpuMeter':
+        for type_name in DECODED_TYPES:
+            self._wrap(getattr(battle_client.types, type_name), 'convert', 'decode_sec', wrap_static=True)
+        self._wrap(battle_client.client, 'crabada_checksum', 'checksum_sec', wrap_static=False)
+        return self
+
+    def __exit__(self, *_):
+        for owner, name, original in reversed(self._restore):
+            setattr(owner, name, original)
+        self._restore = []
+
+
+def unthrottled() -> RateLimiter:
+    return RateLimiter({'read': TokenBucket(0), 'mutation': TokenBucket(0)})
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if platform.system() == 'Darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+async def run_cycles(url: Optional[str], recording: Optional[str], accounts: int, cycles: int,
+                     cycle_gap_sec: float, profile_dir: Optional[str] = None,
+                     profile_name: str = 'bench') -> list[dict[str, Any]]:
+    transport = MeteredReplay(recording) if recording else MeteredTransport(max_concurrent_requests=50)
+    bots = []
+    for i in range(accounts):
+        client = AsyncBattleClient(f'bench-{i}', transport=transport, base_url=url or 'http://replay',
+                                   rate_limiter=unthrottled())
+        bots.append(BattleManager(client, AlertManager(f'bench-{i}')))
+    # One sampler covers the whole loop, so profiling one account is enough.
+    profiler = CycleProfiler(1 if profile_dir else 0, profile_dir or '', name=profile_name)
+
+    results = []
+    try:
+        for cycle in range(cycles):
+            if cycle:
+                # Long enough for the (zero length) mines from the last cycle to finish.
+                await asyncio.sleep(cycle_gap_sec)
+            calls_before = dict(transport.calls)
+            sent_before, received_before = transport.bytes_sent, transport.bytes_received
+            json_before = transport.json_cpu_sec
+            cpu_before = time.process_time()
+            start = time.perf_counter()
+            profiler.start_cycle(lambda: bots[0].phases.current)
+            with CpuMeter() as meter:
+                outcomes = await asyncio.gather(*[bot.do_action_loop() for bot in bots], return_exceptions=True)
+            wall_sec = time.perf_counter() - start
+            profiler.finish_cycle()
+
+            phases: dict[str, float] = {}
+            for bot in bots:
+                for name, sec in bot.phases.timings.items():
+                    phases[name] = phases.get(name, 0) + sec / len(bots)
+            calls = {k: v - calls_before.get(k, 0) for k, v in transport.calls.items()
+                     if v - calls_before.get(k, 0)}
+            results.append({
+                'wall_sec': wall_sec,
+                'cpu_sec': time.process_time() - cpu_before,
+                # Mean across accounts; accounts run concurrently, so these overlap.
+                'phase_sec': phases,
+                'api_calls': sum(calls.values()),
+                'api_calls_by_endpoint': calls,
+                'bytes_sent': transport.bytes_sent - sent_before,
+                'bytes_received': transport.bytes_received - received_before,
+                'json_cpu_sec': transport.json_cpu_sec - json_before,
+                'decode_cpu_sec': meter.decode_sec,
+                'checksum_cpu_sec': meter.checksum_sec,
+                'failed_accounts': sum(isinstance(o, Exception) for o in outcomes),
+            })
+    finally:
+        await transport.close()
+    return results
+
+
+def run_one(size: dict[str, Any], url: Optional[str], recording: Optional[str], cycles: int,
+            cycle_gap_sec: float, profile_dir: Optional[str], out: multiprocessing.Queue):
+    """Child process entry point: run the cycles for one size and report back."""
+    rss_before = peak_rss_mb()
+    with open(os.devnull, 'w') as devnull:
+        # Log as the bot would (queued, JSON), just not anywhere we'll see it.
+        setup_logging(stream=devnull)
+        profile_name = f'bench-{size["crabs"]}crabs-{size["accounts"]}accounts'
+        cycle_results = asyncio.run(run_cycles(url, recording, size['accounts'], cycles, cycle_gap_sec,
+                                               profile_dir, profile_name))
+        logging.shutdown()
+    out.put({**size, 'rss_before_mb': rss_before, 'peak_rss_mb': peak_rss_mb(), 'cycles': cycle_results})
+
+
+class ServerThread(object):
+    """A MockBattleServer on its own loop, in a background thread of this process."""
+
+    def __init__(self, crabs: int, seed: int):
+        # Mines finish right away, so the second cycle has everything to claim.
+        game = MockGame(GameSettings(crabs_per_account=crabs, mine_duration_sec=0, seed=seed))
+        self.server = MockBattleServer(game)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        return asyncio.run_coroutine_threadsafe(self.server.start(port=0), self.loop).result()
+
+    def __exit__(self, *_):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def run_size(size: dict[str, Any], args: argparse.Namespace) -> dict[str, Any]:
+    ctx = multiprocessing.get_context('spawn')
+    out = ctx.Queue()
+
+    def run_child(url: Optional[str]) -> dict[str, Any]:
+        child = ctx.Process(target=run_one, args=(size, url, args.recording, args.cycles, args.cycle_gap,
+                                                  args.profile_dir, out))
+        child.start()
+        result = out.get()
+        child.join()
+        return result
+
+    if args.recording:
+        return run_child(None)
+    with ServerThread(size['crabs'], args.seed) as url:
+        return run_child(url)
+
+
+def print_result(result: dict[str, Any]):
+    print(f'{result["crabs"]} crabs x {result["accounts"]} accounts: peak RSS {result["peak_rss_mb"]:.0f}MB'
+          f' (imports {result["rss_before_mb"]:.0f}MB)')
+    for i, cycle in enumerate(result['cycles'], start=1):
+        phases = ', '.join(f'{k} {v * 1000:.0f}ms' for k, v in cycle['phase_sec'].items())
+        print(f'  cycle {i}: {cycle["wall_sec"]:.2f}s wall, {cycle["cpu_sec"]:.2f}s cpu,'
+              f' {cycle["api_calls"]} calls, {cycle["bytes_sent"] / 1024:.0f}KB out'
+              f' {cycle["bytes_received"] / 1024:.0f}KB in,'
+              f' json {cycle["json_cpu_sec"] * 1000:.0f}ms decode {cycle["decode_cpu_sec"] * 1000:.0f}ms'
+              f' checksum {cycle["checksum_cpu_sec"] * 1000:.0f}ms'
+              + (f', {cycle["failed_accounts"]} FAILED' if cycle['failed_accounts'] else ''))
+        print(f'           {phases}')
+
+
+def compare(results: list[dict[str, Any]], baseline_path: str):
+    """Print how each size's totals moved against the same size in an earlier run."""
+    with open(baseline_path) as f:
+        baseline = {(r['crabs'], r['accounts']): r for r in json.load(f)['results']}
+    metrics = ['wall_sec', 'cpu_sec', 'api_calls', 'bytes_received', 'decode_cpu_sec', 'checksum_cpu_sec']
+    print(f'Compared to {baseline_path}:')
+    for result in results:
+        old = baseline.get((result['crabs'], result['accounts']))
+        if old is None:
+            continue
+        changes = []
+        for metric in metrics:
+            new_total = sum(c[metric] for c in result['cycles'])
+            old_total = sum(c[metric] for c in old['cycles'])
+            if old_total:
+                changes.append(f'{metric} {(new_total - old_total) / old_total:+.0%}')
+        changes.append(f'peak_rss {(result["peak_rss_mb"] - old["peak_rss_mb"]) / old["peak_rss_mb"]:+.0%}')
+        print(f'  {result["crabs"]} crabs x {result["accounts"]} accounts: ' + ', '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End to end bot cycle benchmark')
+    parser.add_argument('--crabs', type=int, nargs='+', default=[10, 100, 1000], help='crabs per account')
+    parser.add_argument('--accounts', type=int, nargs='+', default=[1], help='accounts in the process')
+    parser.add_argument('--cycles', type=int, default=2)
+    parser.add_argument('--cycle-gap', type=float, default=1.1, help='seconds between cycles')
+    parser.add_argument('--recording', help='replay this recording instead of running the mock API')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results here as JSON')
+    parser.add_argument('--baseline', help='earlier --output to compare against')
+    parser.add_argument('--profile-dir', help='write a sampled profile of every cycle here')
+    args = parser.parse_args()
+
+    if args.recording:
+        # A recording is one account's traffic, with whatever crabs it had.
+        sizes = [{'crabs': 0, 'accounts': 1}]
+    else:
+        sizes = [{'crabs': c, 'accounts': a} for c in args.crabs for a in args.accounts]
+
+    results = []
+    for size in sizes:
+        result = run_size(size, args)
+        print_result(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'started_at': time.time(), 'python': platform.python_version(), 'results': results}, f,
+                      indent=2)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
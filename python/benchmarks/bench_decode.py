@@ -0,0 +1,62 @@
+#!/usr/bin/python
+#
+# Compares the hand-written convert() decoders against dacite on API-shaped payloads.
+# Run from the python directory: python -m benchmarks.bench_decode
+#
+# Pass --recording with a file written by RecordingTransport (battle_record_file) to use
+# real payloads instead of generated ones.
+
+import argparse
+import timeit
+
+from battle_client.recording import recorded_results
+from battle_client.types import CrabadaData, MineInfo, set_strict_decoding
+from benchmarks.payloads import crab_list, mine_list
+
+
+def bench(name: str, convert_fn, payloads: list, repeat: int = 5):
+    def run():
+        return [convert_fn(p) for p in payloads]
+
+    set_strict_decoding(True)
+    expected = run()
+    dacite_sec = min(timeit.repeat(run, number=1, repeat=repeat))
+    set_strict_decoding(False)
+    if run() != expected:
+        raise Exception(f'Fast {name} decoder disagrees with dacite')
+    fast_sec = min(timeit.repeat(run, number=1, repeat=repeat))
+
+    per_item = 1e6 / len(payloads)
+    print(f'{name:>12} x{len(payloads)}: dacite {dacite_sec * per_item:7.1f}us/item'
+          f'  fast {fast_sec * per_item:6.1f}us/item  ({dacite_sec / fast_sec:.0f}x)')
+
+
+def recorded_payloads(path: str, path_suffix: str) -> list:
+    payloads = []
+    for result in recorded_results(path, path_suffix):
+        payloads.extend(result or [])
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decoder benchmark')
+    parser.add_argument('--recording', help='recorded API traffic to take payloads from')
+    args = parser.parse_args()
+
+    if args.recording:
+        crabs = recorded_payloads(args.recording, '/crabada-user/private/sync')
+        crabs += recorded_payloads(args.recording, '/crabada-user/private/crabada/mine')
+        mines = recorded_payloads(args.recording, '/mine-zones/mine/open/miner')
+        mines += recorded_payloads(args.recording, '/mine-zones/mine/active/looting')
+        print(f'Loaded {len(crabs)} crabs and {len(mines)} mines from {args.recording}')
+    else:
+        crabs, mines = crab_list(1000), mine_list(300)
+
+    if crabs:
+        bench('CrabadaData', CrabadaData.convert, crabs)
+    if mines:
+        bench('MineInfo', MineInfo.convert, mines)
+
+
+if __name__ == '__main__':
+    main()
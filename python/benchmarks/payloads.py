@@ -0,0 +1,63 @@
+"""Synthetic API payloads shaped like real responses, including the fields we don't decode.
+
+Values come from the sample comments in battle_client/types.py.
+"""
+import random
+from typing import Any
+
+
+def crab_payload(crabada_id: int, rng: random.Random) -> dict[str, Any]:
+    level = rng.randint(1, 10)
+    return {
+        'crabada_id': crabada_id, 'id': crabada_id + 30000, 'user_id': 3456,
+        'name': f'Crabada {crabada_id}', 'description': None,
+        'crabada_class': rng.randint(1, 8), 'class_name': 'PRIME', 'experience': 0,
+        'is_origin': 0, 'is_genesis': 0, 'legend_number': 0, 'pure_number': 6,
+        'parts': [31, 37, 32, 35, 35, 37], 'shell_id': 31, 'horn_id': 37, 'body_id': 32,
+        'mouth_id': 35, 'eyes_id': 35, 'pincers_id': 37,
+        'hp': 3000, 'speed': 38, 'damage': 852, 'critical': 16, 'armor': 68,
+        'level': level, 'real_level': level, 'eat_time': 1652473630,
+        'power_level': rng.randint(0, 30),
+        'pincers_skill': 'IRON_MAN', 'pincers_skill_name': 'AvaBeam', 'pincers_percent': 240,
+        'pincers_turn': 1, 'pincers_skill_description': 'long description',
+        'eyes_effect': 'WEAKEN', 'eyes_effect_name': 'Weaken', 'eyes_effect_percent': 25,
+        'eyes_effect_turn': 1, 'eyes_effect_chance': 10, 'eyes_effect_description': 'long description',
+        'max_hp': 3075, 'max_damage': 877, 'max_armor': 70, 'max_speed': 38, 'max_critical': 16,
+        'max_power_level': 30, 'combat_power': rng.randint(3000, 6000),
+        'energy': {'energy': rng.randint(0, 24), 'reset_time': 1653696000},
+    }
+
+
+def reward_payload(item_id: int, rng: random.Random) -> dict[str, Any]:
+    return {
+        'node_id': 5, 'origin_item_id': item_id, 'amount': round(rng.uniform(1, 5), 2),
+        'percent': 0, 'is_sure': True, 'can_be_looted': True, 'type': 9999,
+        'stackable': True, 'description': 'Crabada Token', 'user_id': 1234,
+    }
+
+
+def mine_payload(mine_id: int, rng: random.Random) -> dict[str, Any]:
+    crab_ids = [mine_id * 3 + i for i in range(3)]
+    return {
+        'mine_id': mine_id, 'node_id': 5, 'miner_id': 1234,
+        'start_time': 1653389330, 'end_time': 1653393370,
+        'crabada_id_1': crab_ids[0], 'crabada_id_2': crab_ids[1], 'crabada_id_3': crab_ids[2],
+        'position_1': 11, 'position_2': 12, 'position_3': 21,
+        'attack_time': 0, 'looter_id': 0,
+        'loot_crabada_id_1': 0, 'loot_crabada_id_2': 0, 'loot_crabada_id_3': 0,
+        'winner_id': 0, 'status': 1, 'process': 1, 'is_looter_claim': False, 'game_record': None,
+        'rewards': [reward_payload(item_id, rng) for item_id in [2, 101001, 101002, 101003, 101004, 101005]],
+        'crabada_1_info': crab_payload(crab_ids[0], rng),
+        'crabada_2_info': crab_payload(crab_ids[1], rng),
+        'crabada_3_info': crab_payload(crab_ids[2], rng),
+    }
+
+
+def crab_list(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [crab_payload(10000 + i, rng) for i in range(count)]
+
+
+def mine_list(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [mine_payload(500000 + i, rng) for i in range(count)]
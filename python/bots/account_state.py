@@ -0,0 +1,111 @@
+import logging
+import time
+from typing import Any, Optional
+
+from battle_client.client import AsyncBattleClient
+from battle_client.types import CrabadaData, InventoryItem, InventorySummary, LV1_MATERIAL_IDS, MineInfo
+from bots.roster import Roster
+
+logger = logging.getLogger(__name__)
+
+
+class AccountState(object):
+    """Local model of an account's crabs and inventory.
+
+    Loaded with a full sync, then updated from mutation responses and recipe arithmetic
+    so the bot doesn't have to re-read everything after every action. Anything we can't
+    model exactly (claims, surprising responses, failed mutations) marks the state dirty,
+    which forces a full sync the next time it's consulted.
+
+    Open mines and loots aren't modelled. Other players change them (a loot attack on
+    one of our mines changes its state and rewards), so the claims phase has to list
+    them every cycle anyway; the response cache already covers repeat listings within
+    a cycle, and claims/new mines invalidate it.
+    """
+
+    def __init__(self, resync_interval_sec: int):
+        self.resync_interval_sec = resync_interval_sec
+        # All crabs on the account, from sync().
+        self.crabs: dict[int, CrabadaData] = {}
+        # Crabs that can be fed/sent to mine, from list_available_crabs().
+        self.available: dict[int, CrabadaData] = {}
+        # Columnar copy of available, rebuilt only after it changes.
+        self._available_roster: Optional[Roster] = None
+        # Item id -> amount for materials and food.
+        self.inventory: dict[int, int] = {}
+        self.synced_at = 0.0
+        self.dirty = True
+
+    def needs_sync(self) -> bool:
+        return self.dirty or time.time() - self.synced_at > self.resync_interval_sec
+
+    def mark_dirty(self, reason: str):
+        if not self.dirty:
+            logger.info('Account state needs a sync: %s', reason)
+        self.dirty = True
+
+    async def sync(self, client: AsyncBattleClient):
+        """Reload everything from the API."""
+        logger.info('Syncing account state')
+        all_crabs = await client.sync()
+        inventory = await client.inventory()
+        available_crabs = await client.list_available_crabs()
+        self.crabs = {c.crabada_id: c for c in all_crabs}
+        self.available = {c.crabada_id: c for c in available_crabs}
+        self._available_roster = None
+        self.inventory = {i.origin_item_id: i.amount for i in inventory}
+        self.synced_at = time.time()
+        self.dirty = False
+
+    async def ensure_synced(self, client: AsyncBattleClient):
+        if self.needs_sync():
+            await self.sync(client)
+
+    def crab_count(self) -> int:
+        return len(self.crabs)
+
+    def available_crabs(self) -> list[CrabadaData]:
+        return list(self.available.values())
+
+    def available_roster(self) -> Roster:
+        if self._available_roster is None:
+            self._available_roster = Roster(self.available_crabs())
+        return self._available_roster
+
+    def inventory_summary(self) -> InventorySummary:
+        return InventorySummary.from_counts(self.inventory)
+
+    def apply_craft(self, output_id: int, amount: int):
+        """Crafting `amount` of anything lv1 uses `amount` of each lv1 material."""
+        for mat_id in LV1_MATERIAL_IDS:
+            self.inventory[mat_id] = self.inventory.get(mat_id, 0) - amount
+        # TUS goes to money rather than inventory, so only food shows up here.
+        if output_id == InventoryItem.SANDWICH_ID:
+            self.inventory[output_id] = self.inventory.get(output_id, 0) + amount
+
+    def apply_feed(self, crabada_id: int, food_id: int, response: Any):
+        """Use the crab returned from a feed; if it doesn't look like one, we need a sync."""
+        self.inventory[food_id] = self.inventory.get(food_id, 0) - 1
+        try:
+            fed = CrabadaData.convert(response)
+        except Exception as ex:
+            self.mark_dirty(f'unexpected feed response for {crabada_id}: {ex}')
+            return
+        self.crabs[crabada_id] = fed
+        if crabada_id in self.available:
+            self.available[crabada_id] = fed
+            self._available_roster = None
+
+    def apply_start_mine(self, mine: MineInfo, crab_ids: list[int]):
+        """Crabs sent to mine aren't available until the mine is claimed."""
+        for crab_id in crab_ids:
+            self.available.pop(crab_id, None)
+        self._available_roster = None
+        # The mine reports the crabs as they are now (e.g. with less energy).
+        for crab_info in [mine.crabada_1_info, mine.crabada_2_info, mine.crabada_3_info]:
+            if crab_info and crab_info.crabada_id in self.crabs:
+                self.crabs[crab_info.crabada_id] = crab_info
+
+    def apply_claim(self, mine: MineInfo):
+        """Claims free up crabs and pay out rewards we can't fully predict."""
+        self.mark_dirty(f'claimed {mine.mine_id}')
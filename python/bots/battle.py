@@ -1,58 +1,116 @@
 import asyncio
-import random
-import traceback
+import logging
+import time
 from datetime import datetime
-from typing import Tuple
+from typing import Optional
 
-from battle_client.client import BattleClient
-from battle_client.types import MineInfo, InventorySummary, CrabadaData, InventoryItem
+from battle_client.client import AsyncBattleClient, load_keys
+from battle_client.types import MineInfo, InventorySummary, CrabadaData, InventoryItem, MoneyItem
+from bots.account_state import AccountState
+from bots.roster import Roster
+from bots.teams import plan_teams
 from common.config_local import DEFAULT_CONFIG
 from common.cooldown import CooldownManager
 from common.discord import AlertManager
+from common.logs import bind, log_context
+from common.phases import PhaseTimer
+from common.pipeline import run_bounded
+from common.profiler import CycleProfiler
+from common.scheduler import DeadlineScheduler
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on list/claim rounds per cycle, in case a claim keeps failing.
+MAX_CLAIM_PASSES = 3
 
 
 class BattleManager(object):
     """Bot class that manages the BattleGame interactions."""
 
-    def __init__(self):
+    def __init__(self,
+                 battle_client: Optional[AsyncBattleClient] = None,
+                 alert_manager: Optional[AlertManager] = None):
+        """Without arguments, runs the single account in battle_keys.json.
+
+        When running several accounts in one process, pass in a client per account
+        (sharing a transport) and an AlertManager labeled with the account name.
+        """
         # Configuration for the bot.
         self.config = DEFAULT_CONFIG
         # API Client.
-        self.battle_client = BattleClient()
+        if battle_client is None:
+            keys = load_keys()
+            battle_client = AsyncBattleClient(keys['access_token'], keys['refresh_token'])
+        self.battle_client = battle_client
 
         # Discord alert posting.
-        self.alert_manager = AlertManager()
-        # How frequently we will cycle through actions.
+        self.alert_manager = alert_manager or AlertManager()
+        if self.config.battle_alert_digest:
+            self.alert_manager.start_digest()
+        # How long to wait before retrying a cycle that failed.
         self.poll_interval = self.config.battle_poll_interval
+        # Tracks when mines/loots/crabs become actionable, so we only cycle when needed.
+        self.scheduler = DeadlineScheduler(self.config.battle_safety_poll_interval)
+        # Local copy of crabs/inventory, kept up to date as we act on the account.
+        self.state = AccountState(self.config.battle_state_resync_interval)
+        # Where the time in the last cycle went.
+        self.phases = PhaseTimer()
+        # Samples every Nth cycle, if turned on in the config.
+        self.profiler = CycleProfiler(self.config.battle_profile_every, self.config.battle_profile_dir,
+                                      self.config.battle_profile_interval_ms / 1000,
+                                      name=self.alert_manager.account or 'bot')
 
-        # Amount of time between any action executed.
-        self.action_cd = CooldownManager('execute_action', 5)
         # Minimum amount of time between attempting to loot.
         self.loot_action_cd = CooldownManager('loot_action', 90)
 
     async def mine_loop(self):
-        print('Game loop starting')
-
-        # Bot is starting up so post a notification to Discord.
-        # Include details about money because why not.
-        money = self.battle_client.money()
-        content = 'Money in account'
-        for m in money:
-            content += f'\n  {m.item_name}: {m.amount}'
-        self.alert_manager.simple_embed('Bot Starting', content)
+        if self.alert_manager.account:
+            # Everything logged by this account's task says which account it was.
+            bind(account=self.alert_manager.account)
+        logger.info('Game loop starting')
+        announced = False
 
         # Primary action/sleep loop, capturing all exceptions and alerting on them.
+        # Each cycle reschedules wakeups from what it saw, then we sleep until the first one.
         while True:
+            max_sleep = None
+            self.profiler.start_cycle(lambda: self.phases.current)
             try:
+                if not announced:
+                    # Inside the try so a bad token is alerted and retried like any other failure.
+                    await self.announce_start()
+                    announced = True
+                self.scheduler.clear()
                 await self.do_action_loop()
             except Exception as ex:
-                print(traceback.format_exc())
+                logger.exception('Cycle failed')
                 self.alert_manager.error(str(ex))
-
-            await asyncio.sleep(self.poll_interval)
+                max_sleep = self.poll_interval
+                # We don't know how far the cycle got, so don't trust the local state.
+                self.state.mark_dirty('cycle failed')
+            self.alert_manager.flush_digest(self.config.battle_alert_digest_window)
+            self.profiler.finish_cycle()
+            logger.info('Cycle took %.2fs: %s', self.phases.finish_cycle(), self.phases.summary())
+            logger.info('Throttling: %s', self.battle_client.rate_limiter.summary())
+            logger.info('Read cache: %s; in-flight reads: %s', self.battle_client.cache.summary(),
+                        self.battle_client.flights.summary())
+            logger.info('Circuits: %s', self.battle_client.breakers.summary())
+
+            await self.scheduler.wait(max_sleep)
+
+    async def announce_start(self):
+        """Bot is starting up so post a notification to Discord.
+
+        Include details about money because why not.
+        """
+        money = await self.battle_client.money()
+        content = 'Money in account'
+        for m in money:
+            content += f'\n  {m.item_name}: {m.amount}'
+        self.alert_manager.simple_embed('Bot Starting', content)
 
     async def do_action_loop(self):
-        """Do stuff every period.
+        """Do stuff whenever the scheduler wakes us up.
 
         In order, if we need to:
         1) Close mines
@@ -62,32 +120,34 @@ class BattleManager(object):
         5) Loot one time
         6) Open as many mines as necessary
         """
-        print('Looping through actions')
+        logger.info('Looping through actions')
+        phases = self.phases
+        phases.start_cycle()
 
-        # Since there is a delay between actions, additional mines / loots might
-        # need to closed by the time we're done closing the first batch. So do it
-        # in a loop until we stop doing stuff.
-        did_close_mines = True
-        while did_close_mines:
-            did_close_mines = await self.try_closing_mines()
+        # Mines and loots are listed and claimed together, so they're timed together too.
+        with phases.phase('claims'):
+            await self.try_closing_mines_and_loots()
 
-        did_close_loots = True
-        while did_close_loots:
-            did_close_loots = await self.try_closing_loots()
+        # Claims (or a failure, or enough time passing) mean we need to sync up again.
+        with phases.phase('sync'):
+            await self.state.ensure_synced(self.battle_client)
 
         # Get food if necessary. Return the resulting inventory and check if we can make TUS.
-        inventory_summary = await self.try_acquire_food()
-        await self.try_acquire_tus(inventory_summary)
+        with phases.phase('food'):
+            inventory_summary = await self.try_acquire_food()
+        with phases.phase('tus'):
+            await self.try_acquire_tus(inventory_summary)
 
         # if self.config.battle_auto_level:
         #     await self.try_level_crabs()
 
         # Check what crabs are ready to be used, see if they need to be fed and feed em.
-        available_crabs = self.battle_client.list_available_crabs()
-        available_crabs = await self.try_feed_crabs(available_crabs, inventory_summary)
+        with phases.phase('feed'):
+            available = await self.try_feed_crabs(self.state.available_roster(), self.state.inventory_summary())
 
         # Figure out what mining zones have been cleared.
-        mine_zones = self.battle_client.list_mine_zones()
+        with phases.phase('mine_zones'):
+            mine_zones = await self.battle_client.list_mine_zones()
         attackable_node_ids = [mz.node_id for mz in mine_zones if mz.is_attackable_mine_zone()]
         if not attackable_node_ids:
             # Some people are too dumb to complete adventure mode before starting the bot.
@@ -106,7 +166,8 @@ class BattleManager(object):
 
         # Mining node is hardcoded to 5; let the noobs there loot and fail.
         # Higher nodes are likely to have actual players.
-        await self.try_open_mines(5, available_crabs)
+        with phases.phase('open_mines'):
+            await self.try_open_mines(5, available)
         # await self.try_loot(attackable_node_ids, loot_crabs, inventory_summary)
         #
         # if self.withdraw_cd.check_date():
@@ -118,165 +179,214 @@ class BattleManager(object):
         # if self.swap_cd.check_date():
         #     await self.do_swap()
 
-    async def try_closing_mines(self) -> bool:
-        """Attempt to close mines, returning True if any mine was closed."""
-        print('Checking if mines need to be closed')
-        did_close_mines = False
-        open_mines = self.battle_client.list_my_open_mines(0)
+    async def try_closing_mines_and_loots(self):
+        """Claim every finished mine and loot from one listing of each.
+
+        Claims run a few at a time, paced by the client's rate limiter. We only list again
+        if a claim failed (our view was stale) or another mine/loot finished while we
+        were busy claiming.
+        """
+        for _ in range(MAX_CLAIM_PASSES):
+            logger.info('Checking if mines/loots need to be closed')
+            open_mines, open_loots = await asyncio.gather(
+                self.battle_client.list_my_open_mines(0),
+                self.battle_client.list_my_open_loots(0))
+            claims = [(self.claim_mine, m) for m in self.find_claimable_mines(open_mines)]
+            claims += [(self.claim_loot, loot) for loot in self.find_claimable_loots(open_loots)]
+            if not claims:
+                return
+
+            results = await run_bounded(lambda c: self.claim(*c), claims, self.config.battle_claim_concurrency)
+            failed = False
+            for (claim_fn, mine), result in zip(claims, results):
+                if isinstance(result, Exception):
+                    failed = True
+                    self.state.mark_dirty(f'failed to claim {mine.mine_id}')
+                    action = 'Claim Mine' if claim_fn == self.claim_mine else 'Claim Loot'
+                    self.alert_manager.start_action(action, -1, mine.mine_id).error(str(result))
+
+            now = time.time()
+            newly_due = any(m.end_time < now for m in open_mines if not m.is_complete())
+            newly_due |= any(loot.looter_claim_time() < now for loot in open_loots if not loot.can_looter_claim())
+            if not failed and not newly_due:
+                return
+
+    async def claim(self, claim_fn, mine: MineInfo):
+        with log_context(mine_id=mine.mine_id):
+            await claim_fn(mine)
+
+    def find_claimable_mines(self, open_mines: list[MineInfo]) -> list[MineInfo]:
+        """Mines that can be claimed now; schedules a wakeup for the rest."""
+        claimable = []
         for mine in open_mines:
             if mine.is_complete():
-                did_close_mines = True
-                await self.claim_mine(mine)
-                await asyncio.sleep(5)
-        return did_close_mines
-
-    async def try_closing_loots(self) -> bool:
-        """Attempt to close loots, returning True if any loot was closed."""
-        print('Checking if loots need to be closed')
-        did_close_loots = False
-        open_loots = self.battle_client.list_my_open_loots(0)
+                claimable.append(mine)
+            else:
+                self.scheduler.schedule(mine.end_time + 1, f'mine {mine.mine_id} complete')
+        return claimable
+
+    def find_claimable_loots(self, open_loots: list[MineInfo]) -> list[MineInfo]:
+        """Loots that can be claimed now; schedules a wakeup for the rest."""
+        claimable = []
         for loot in open_loots:
             if loot.can_looter_claim():
-                did_close_loots = True
-                await self.claim_loot(loot)
-                await asyncio.sleep(5)
-        return did_close_loots
+                claimable.append(loot)
+            else:
+                self.scheduler.schedule(loot.looter_claim_time() + 1, f'loot {loot.mine_id} claimable')
+        return claimable
 
     async def try_acquire_food(self) -> InventorySummary:
         """Attempt to ensure we have at least 1 food per crab."""
-        all_crabs = self.battle_client.sync()
-        inventory_summary = InventorySummary(self.battle_client.inventory())
-        if inventory_summary.sandwich_count >= len(all_crabs):
-            print(f'Food level is sufficient: {inventory_summary.sandwich_count}')
+        inventory_summary = self.state.inventory_summary()
+        if inventory_summary.sandwich_count >= self.state.crab_count():
+            logger.info('Food level is sufficient: %d', inventory_summary.sandwich_count)
             return inventory_summary
-        want_food = len(all_crabs) - inventory_summary.sandwich_count
+        want_food = self.state.crab_count() - inventory_summary.sandwich_count
         if not inventory_summary.convert_available():
-            print(f'Food level is deficient but unable to convert, wanted to make: {want_food}')
+            logger.info('Food level is deficient but unable to convert, wanted to make: %d', want_food)
             return inventory_summary
 
         request_food = min(want_food, inventory_summary.convert_available())
         await self.craft_food(request_food)
-        await asyncio.sleep(5)
-        inventory_summary = InventorySummary(self.battle_client.inventory())
-        await asyncio.sleep(1)
-        return inventory_summary
+        return self.state.inventory_summary()
 
     async def try_acquire_tus(self, inventory_summary: InventorySummary):
         if not inventory_summary.convert_available():
-            print('Insufficient materials to craft tus')
+            logger.info('Insufficient materials to craft tus')
             return
         await self.craft_tus(inventory_summary.convert_available())
-        await asyncio.sleep(5)
 
-    async def try_feed_crabs(self,
-                             available_crabs: list[CrabadaData],
-                             inventory_summary: InventorySummary) -> list[CrabadaData]:
-        crabs_to_feed = [c for c in available_crabs if c.power_level < 2 or c.effective_level < c.max_level]
+    async def try_feed_crabs(self, available: Roster, inventory_summary: InventorySummary) -> Roster:
+        crabs_to_feed = available.select(available.needs_feeding())
         if not crabs_to_feed:
-            print('No crabs need to be fed')
-            return available_crabs
+            logger.info('No crabs need to be fed')
+            return available
 
         if inventory_summary.sandwich_count:
             await self.feed_crabs(crabs_to_feed)
-            await asyncio.sleep(5)
-            available_crabs = self.battle_client.list_available_crabs()
-            await asyncio.sleep(1)
-
-        return available_crabs
-
-    async def try_open_mines(self, attack_node: int, available_crabs: list[CrabadaData]):
-        available_crabs = [c for c in available_crabs if c.power_level >= 2 and c.energy.energy >= 4]
-        if len(available_crabs) < 3:
-            print('Not enough crabs to mine')
+            # Fed crabs come back in the feed responses; only re-read if one didn't.
+            await self.state.ensure_synced(self.battle_client)
+            available = self.state.available_roster()
+
+        return available
+
+    async def try_open_mines(self, attack_node: int, available: Roster):
+        # Crabs out of energy can mine again once it resets.
+        for reset_time in available.energy_resets(available.out_of_energy()):
+            self.scheduler.schedule(reset_time + 1, 'crab energy reset')
+        eligible = available.mine_eligible()
+        if eligible.sum() < 3:
+            logger.info('Not enough crabs to mine')
             return
 
-        random.shuffle(available_crabs)
-        tank = [c for c in available_crabs if c.is_tank()]
-        dps = [c for c in available_crabs if c.is_dps()]
-        sup = [c for c in available_crabs if c.is_sup()]
-
-        print(f'Trying to open {len(available_crabs) // 3} mines in {attack_node}'
-              f' using {len(tank)} tank {len(dps)} dps {len(sup)} sup')
-        while len(tank) + len(dps) + len(sup) > 2:
-            crab1, crab1p, crab2, crab2p, crab3, crab3p = assemble_team(tank, dps, sup)
+        tank, dps, sup = available.role_counts(eligible)
+        logger.info('Trying to open %d mines in %d using %d tank %d dps %d sup',
+                    eligible.sum() // 3, attack_node, tank, dps, sup)
+        teams = plan_teams(available.subset(eligible),
+                           self.config.battle_self_badcomp_penalty, self.config.battle_faction_bonus)
+        for crab1, crab1p, crab2, crab2p, crab3, crab3p in teams:
             await self.start_mine(attack_node, crab1, crab1p, crab2, crab2p, crab3, crab3p)
-            await asyncio.sleep(5)
 
     async def claim_mine(self, mine: MineInfo):
-        print(f'Trying to claim mine {mine.mine_id} in node {mine.node_id}')
-        if not self.action_cd.check_cooldown(0):
-            return
-        self.alert_manager.start_action('Claim Mine', -1, mine.mine_id)
-        self.battle_client.claim_mine(mine.mine_id)
-        if mine.winner_id == mine.miner_id:
+        alert = self.alert_manager.start_action('Claim Mine', -1, mine.mine_id)
+        logger.info('Trying to claim mine %d in node %d', mine.mine_id, mine.node_id)
+        await self.battle_client.claim_mine(mine.mine_id)
+        self.state.apply_claim(mine)
+        won = mine.winner_id == mine.miner_id
+        if won:
             result_text = 'You won!'
             icon = 'https://i.imgur.com/TPFdwZG.png'
         else:
             result_text = 'You lost.'
             icon = 'https://i.imgur.com/LON2Wdj.png'
-        self.alert_manager.ok(result_text, icon=icon)
+        alert.ok(result_text, icon=icon, tally={'Mines won' if won else 'Mines lost': 1})
 
     async def claim_loot(self, loot: MineInfo):
-        print(f'Trying to claim loot {loot.mine_id} in node {loot.node_id}')
-        if not self.action_cd.check_cooldown(0):
-            return
-        self.alert_manager.start_action('Claim Loot', -1, loot.mine_id)
-        self.battle_client.claim_loot(loot.mine_id)
-        self.alert_manager.ok('Done')
+        alert = self.alert_manager.start_action('Claim Loot', -1, loot.mine_id)
+        logger.info('Trying to claim loot %d in node %d', loot.mine_id, loot.node_id)
+        await self.battle_client.claim_loot(loot.mine_id)
+        self.state.apply_claim(loot)
+        alert.ok('Done', tally={'Loots claimed': 1})
 
     async def start_mine(self,
                          node_id: int,
                          crab1: CrabadaData, crab1p: str,
                          crab2: CrabadaData, crab2p: str,
                          crab3: CrabadaData, crab3p: str):
-        print(f'Starting mine with {crab1.crabada_id} / {crab2.crabada_id} / {crab3.crabada_id}')
-        if not self.action_cd.check_cooldown(0):
-            return
-        self.alert_manager.start_action('Start Mine', -1)
-        self.battle_client.start_mine(node_id,
-                                      crab1.crabada_id, crab1p,
-                                      crab2.crabada_id, crab2p,
-                                      crab3.crabada_id, crab3p)
+        logger.info('Starting mine with %d / %d / %d', crab1.crabada_id, crab2.crabada_id, crab3.crabada_id)
+        alert = self.alert_manager.start_action('Start Mine', -1)
+        mine = await self.battle_client.start_mine(node_id,
+                                                   crab1.crabada_id, crab1p,
+                                                   crab2.crabada_id, crab2p,
+                                                   crab3.crabada_id, crab3p)
+        self.scheduler.schedule(mine.end_time + 1, f'mine {mine.mine_id} complete')
+        self.state.apply_start_mine(mine, [crab1.crabada_id, crab2.crabada_id, crab3.crabada_id])
         content = f'Started mine in node {node_id} using:'
         content += f'\n  {crab1.class_enum().name}({crab1.effective_level}) in {fix_pos(crab1p)}'
         content += f'\n  {crab2.class_enum().name}({crab2.effective_level}) in {fix_pos(crab2p)}'
         content += f'\n  {crab3.class_enum().name}({crab3.effective_level}) in {fix_pos(crab3p)}'
-        self.alert_manager.ok(content)
+        alert.ok(content, tally={'Mines started': 1})
 
     async def craft_food(self, amount: int):
-        print(f'Crafting {amount} sandwiches')
-        if not self.action_cd.check_cooldown(0):
-            return
-        self.alert_manager.start_action('Craft Food', -1)
-        self.battle_client.craft_lv1_food(amount)
-        self.alert_manager.ok(f'Crafted {amount} sandwiches')
+        logger.info('Crafting %d sandwiches', amount)
+        alert = self.alert_manager.start_action('Craft Food', -1)
+        await self.battle_client.craft_lv1_food(amount)
+        self.state.apply_craft(InventoryItem.SANDWICH_ID, amount)
+        alert.ok(f'Crafted {amount} sandwiches', tally={'Food crafted': amount})
 
     async def craft_tus(self, amount: int):
-        print(f'Crafting {amount} TUS')
-        if not self.action_cd.check_cooldown(0):
-            return
-        self.alert_manager.start_action('Craft Tus', -1)
-        self.battle_client.craft_lv1_tus(amount)
-        self.alert_manager.ok(f'Crafted {amount * 51} tus')
+        logger.info('Crafting %d TUS', amount)
+        alert = self.alert_manager.start_action('Craft Tus', -1)
+        await self.battle_client.craft_lv1_tus(amount)
+        self.state.apply_craft(MoneyItem.TUS_ID, amount)
+        alert.ok(f'Crafted {amount * 51} tus', tally={'TUS made': amount * 51})
 
     async def feed_crabs(self, crabs_to_feed: list[CrabadaData]):
-        print(f'Feeding {len(crabs_to_feed)} crabs')
-        if not self.action_cd.check_cooldown(0):
-            return
-        self.alert_manager.start_action('Feed Crabs', -1)
-        for crab in crabs_to_feed:
-            self.battle_client.feed_crab(crab.crabada_id, InventoryItem.SANDWICH_ID)
-            await asyncio.sleep(2)
-        self.alert_manager.ok(f'Fed {len(crabs_to_feed)} crabs')
-
+        """Feed crabs in one batch request if the game supports it, otherwise a few at a time.
 
-def from_in_order(a1: list, a2: list, a3: list):
-    """Pop the first item off any list with items."""
-    if a1:
-        return a1.pop()
-    if a2:
-        return a2.pop()
-    return a3.pop()
+        A crab that fails to feed doesn't stop the others; failures are reported per crab.
+        """
+        alert = self.alert_manager.start_action('Feed Crabs', -1)
+        logger.info('Feeding %d crabs', len(crabs_to_feed))
+        food_id = InventoryItem.SANDWICH_ID
+        if self.battle_client.supports_batch_feed():
+            crab_ids = [c.crabada_id for c in crabs_to_feed]
+            try:
+                fed = await self.battle_client.feed_crabs(crab_ids, food_id)
+            except Exception as ex:
+                logger.warning('Batch feed failed, feeding one at a time instead: %s', ex)
+                # Some of the batch may have gone through, so see who's still hungry rather
+                # than spending a second sandwich on them.
+                self.state.mark_dirty('batch feed failed')
+                await self.state.sync(self.battle_client)
+                roster = self.state.available_roster()
+                hungry = {c.crabada_id for c in roster.select(roster.needs_feeding())}
+                crabs_to_feed = [c for c in crabs_to_feed if c.crabada_id in hungry]
+            else:
+                if not isinstance(fed, list) or len(fed) != len(crab_ids):
+                    # Can't match crabs up with the response; apply_feed will ask for a sync.
+                    fed = [None] * len(crab_ids)
+                for crab_id, fed_crab in zip(crab_ids, fed):
+                    self.state.apply_feed(crab_id, food_id, fed_crab)
+                alert.ok(f'Fed {len(crab_ids)} crabs', tally={'Crabs fed': len(crab_ids)})
+                return
+
+        # Feeds are independent, so run several at once; the rate limiter still paces them.
+        results = await run_bounded(lambda c: self.battle_client.feed_crab(c.crabada_id, food_id),
+                                    crabs_to_feed, self.config.battle_feed_concurrency)
+        failures = []
+        for crab, result in zip(crabs_to_feed, results):
+            if isinstance(result, Exception):
+                failures.append(f'{crab.crabada_id}: {result}')
+                self.state.mark_dirty(f'failed to feed {crab.crabada_id}')
+            else:
+                self.state.apply_feed(crab.crabada_id, food_id, result)
+
+        fed_count = len(crabs_to_feed) - len(failures)
+        if failures:
+            alert.error(f'Fed {fed_count} crabs, {len(failures)} failed:\n' + '\n'.join(failures))
+        else:
+            alert.ok(f'Fed {fed_count} crabs', tally={'Crabs fed': fed_count})
 
 
 def fix_pos(pos: str) -> str:
@@ -293,50 +403,3 @@ def is_in_loot_window() -> bool:
     So the first 16 hours of the day are for looting, and the last 8 are for mining.
     """
     return datetime.utcnow().hour < 17
-
-
-def assemble_team(tank: list[CrabadaData], dps: list[CrabadaData], sup: list[CrabadaData]) -> Tuple[
-    CrabadaData, str, CrabadaData, str, CrabadaData, str]:
-    """Do a mediocre job of assembling a reasonable looking team.
-
-    Assumes we have at least 3 crabs among all 3 lists of crab types.
-    Obviously does not take anything interesting about the opposing crabs into account.
-    """
-    # Always prefer to have a tank in the upper right, but fall back to whatever
-    crab1 = from_in_order(tank, sup, dps)
-    crab1p = '11'
-
-    # If we have an excess of tank / support compared to dps
-    if len(tank) + len(sup) > len(dps):
-        # Pick whichever type we have more of and put it in the middle right
-        bigger = tank if len(tank) > len(sup) else sup
-        crab2 = bigger.pop()
-        crab2p = '12'
-    else:
-        # We have too much dps, so stick them in the back middle
-        crab2 = dps.pop()
-        crab2p = '22'
-
-    # We want to prefer a dps for top left
-    if dps:
-        crab3 = dps.pop()
-        crab3p = '21'
-    else:
-        # But if we don't have dps put anything in
-        crab3 = from_in_order(tank, sup, [])
-        crab3p = '13'
-
-    return crab1, crab1p, crab2, crab2p, crab3, crab3p
-
-
-def score_team(crabs: list[CrabadaData], bad_comp_penalty: int) -> int:
-    """Score is the sum of the effective level, penalized if the team doesn't seem reasonable.
-
-    The penalty is not hardcoded because we want to penalize our own crabs harder than
-    opposing ones.
-    """
-    score = sum([c.effective_level for c in crabs])
-    balanced = any([c.is_dps() for c in crabs]) and any([c.is_tank() for c in crabs])
-    if not balanced:
-        score -= bad_comp_penalty
-    return score
@@ -0,0 +1,82 @@
+import numpy as np
+
+from battle_client.types import CrabadaData, TANK_CLASSES, DPS_CLASSES
+from common.faction import CrabClass
+
+# Role codes, as stored in Roster.role.
+TANK_ROLE = 0
+DPS_ROLE = 1
+SUP_ROLE = 2
+
+# Lookup tables indexed by crabada_class; classes start at 1 so slot 0 is unused.
+_CLASS_TABLE_SIZE = max(CrabClass) + 1
+ROLE_BY_CLASS = np.full(_CLASS_TABLE_SIZE, SUP_ROLE, dtype=np.int8)
+FACTION_BY_CLASS = np.zeros(_CLASS_TABLE_SIZE, dtype=np.int8)
+for _crab_class in CrabClass:
+    if _crab_class in TANK_CLASSES:
+        ROLE_BY_CLASS[_crab_class] = TANK_ROLE
+    elif _crab_class in DPS_CLASSES:
+        ROLE_BY_CLASS[_crab_class] = DPS_ROLE
+    FACTION_BY_CLASS[_crab_class] = _crab_class.faction()
+
+
+class Roster(object):
+    """Columnar view of a list of crabs, for filtering and scoring without per-crab Python.
+
+    Built once per list of crabs (e.g. after a sync); every column is a NumPy array in the
+    same order as `crabs`, so boolean masks over the columns pick crabs back out with select().
+    """
+
+    def __init__(self, crabs: list[CrabadaData]):
+        self.crabs = list(crabs)
+        self.ids = np.array([c.crabada_id for c in crabs], dtype=np.int64)
+        self.crab_class = np.array([c.crabada_class for c in crabs], dtype=np.int8)
+        self.level = np.array([c.level for c in crabs], dtype=np.int32)
+        self.real_level = np.array([c.real_level for c in crabs], dtype=np.int32)
+        self.power_level = np.array([c.power_level for c in crabs], dtype=np.int32)
+        self.max_power_level = np.array([c.max_power_level for c in crabs], dtype=np.int32)
+        self.combat_power = np.array([c.combat_power for c in crabs], dtype=np.int32)
+        self.energy = np.array([c.energy.energy for c in crabs], dtype=np.int32)
+        self.energy_reset_time = np.array([c.energy.reset_time for c in crabs], dtype=np.int64)
+
+        # Same math as CrabadaData, a column at a time.
+        self.max_level = np.maximum(self.level, self.real_level)
+        ratio = self.power_level / self.max_power_level
+        self.effective_level = np.maximum(np.ceil(ratio * self.max_level), 1).astype(np.int32)
+        self.role = ROLE_BY_CLASS[self.crab_class]
+        self.faction = FACTION_BY_CLASS[self.crab_class]
+
+    def __len__(self) -> int:
+        return len(self.crabs)
+
+    def select(self, mask: np.ndarray) -> list[CrabadaData]:
+        """The crabs for a boolean mask (or index array) over the columns."""
+        indexes = np.flatnonzero(mask) if mask.dtype == bool else mask
+        return [self.crabs[i] for i in indexes]
+
+    def subset(self, mask: np.ndarray) -> 'Roster':
+        """A roster of just the masked crabs, sliced from these columns."""
+        roster = Roster.__new__(Roster)
+        for name, value in vars(self).items():
+            roster.__dict__[name] = value[mask] if isinstance(value, np.ndarray) else value
+        roster.crabs = self.select(mask)
+        return roster
+
+    def needs_feeding(self) -> np.ndarray:
+        """Crabs that are too hungry to mine, or not mining at their full level."""
+        return (self.power_level < 2) | (self.effective_level < self.max_level)
+
+    def mine_eligible(self, min_power: int = 2, min_energy: int = 4) -> np.ndarray:
+        return (self.power_level >= min_power) & (self.energy >= min_energy)
+
+    def out_of_energy(self, min_energy: int = 4) -> np.ndarray:
+        return self.energy < min_energy
+
+    def energy_resets(self, mask: np.ndarray) -> list[int]:
+        """Distinct energy reset times for the masked crabs."""
+        return np.unique(self.energy_reset_time[mask]).tolist()
+
+    def role_counts(self, mask: np.ndarray) -> tuple[int, int, int]:
+        """How many tank, dps and sup crabs are in the mask."""
+        tank, dps, sup = np.bincount(self.role[mask], minlength=3)[:3]
+        return int(tank), int(dps), int(sup)
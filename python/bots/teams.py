@@ -0,0 +1,163 @@
+from itertools import combinations_with_replacement
+from typing import Tuple
+
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from battle_client.types import CrabadaData
+from bots.roster import Roster, TANK_ROLE, DPS_ROLE, SUP_ROLE
+from common.faction import Faction
+
+TANK = 'tank'
+DPS = 'dps'
+SUP = 'sup'
+
+# A team with its formation, in the argument order start_mine expects.
+PositionedTeam = Tuple[CrabadaData, str, CrabadaData, str, CrabadaData, str]
+
+# Team scores only depend on each crab's level, role and faction. Classes that share a
+# role and faction (surge/bulk) are interchangeable, so the solver works on these kinds.
+Kind = Tuple[str, Faction]
+
+ROLE_NAMES = {TANK_ROLE: TANK, DPS_ROLE: DPS, SUP_ROLE: SUP}
+
+
+def crab_role(crab: CrabadaData) -> str:
+    if crab.is_tank():
+        return TANK
+    if crab.is_dps():
+        return DPS
+    return SUP
+
+
+def crab_kind(crab: CrabadaData) -> Kind:
+    return crab_role(crab), crab.class_enum().faction()
+
+
+def composition_bonus(kinds: list[Kind], bad_comp_penalty: int, faction_bonus: int) -> int:
+    """The part of a team's score that depends on its makeup rather than crab levels.
+
+    Teams without both a tank and a dps are penalized; teams with a faction (see
+    Faction.majority) get a bonus.
+    """
+    roles = [k[0] for k in kinds]
+    bonus = 0
+    if TANK not in roles or DPS not in roles:
+        bonus -= bad_comp_penalty
+    if Faction.majority([k[1] for k in kinds]) is not None:
+        bonus += faction_bonus
+    return bonus
+
+
+def score_team(crabs: list[CrabadaData], bad_comp_penalty: int, faction_bonus: int = 0) -> int:
+    """Score is the sum of the effective level, penalized if the team doesn't seem reasonable.
+
+    The penalty is not hardcoded because we want to penalize our own crabs harder than
+    opposing ones. Teams with a faction can optionally get a bonus.
+    """
+    score = sum([c.effective_level for c in crabs])
+    return score + composition_bonus([crab_kind(c) for c in crabs], bad_comp_penalty, faction_bonus)
+
+
+class TeamPlanner(object):
+    """Splits crabs into 3-crab teams maximizing the total score_team of all teams.
+
+    A team's score is its crabs' levels plus a composition bonus that only depends on the
+    kinds (role + faction) in it. Every crab is used except for up to two left on the bench,
+    and within a kind it's always best to bench the lowest levels. So the problem reduces to
+    an integer program that doesn't grow with the roster: how many teams to make of each
+    kind-triple (at most 84 with 7 kinds), and which kinds to bench. HiGHS (via scipy)
+    solves that exactly in a few milliseconds.
+    """
+
+    def __init__(self, bad_comp_penalty: int, faction_bonus: int):
+        self.bad_comp_penalty = bad_comp_penalty
+        self.faction_bonus = faction_bonus
+
+    def plan(self, roster: Roster) -> list[PositionedTeam]:
+        if len(roster) < 3:
+            return []
+        # Group the crabs by kind, strongest first within each kind.
+        kind_codes = roster.role.astype(np.int32) * (max(Faction) + 1) + roster.faction
+        order = np.lexsort((-roster.effective_level, kind_codes))
+        by_kind: dict[Kind, list[CrabadaData]] = {}
+        for code in np.unique(kind_codes):
+            role, faction = divmod(int(code), max(Faction) + 1)
+            by_kind[(ROLE_NAMES[role], Faction(faction))] = roster.select(order[kind_codes[order] == code])
+        kinds = sorted(by_kind)
+        bench_size = len(roster) % 3
+
+        # Columns are team triples, then one column per (kind, nth weakest crab) benched.
+        triples = list(combinations_with_replacement(kinds, 3))
+        benches = [(k, i) for k in kinds for i in range(min(bench_size, len(by_kind[k])))]
+        gains = [composition_bonus(list(t), self.bad_comp_penalty, self.faction_bonus) for t in triples]
+        gains += [-by_kind[k][-i - 1].effective_level for k, i in benches]
+
+        # Every crab of every kind is either on a team or benched.
+        uses = np.zeros((len(kinds), len(gains)))
+        for col, triple in enumerate(triples):
+            for kind in triple:
+                uses[kinds.index(kind), col] += 1
+        for col, (kind, _) in enumerate(benches, start=len(triples)):
+            uses[kinds.index(kind), col] = 1
+        constraints = [LinearConstraint(uses, [len(by_kind[k]) for k in kinds], [len(by_kind[k]) for k in kinds])]
+        if benches:
+            bench_cols = np.zeros(len(gains))
+            bench_cols[len(triples):] = 1
+            constraints.append(LinearConstraint(bench_cols, bench_size, bench_size))
+            # Bench the weakest crab of a kind before the second weakest.
+            for col, (kind, i) in enumerate(benches, start=len(triples)):
+                if i:
+                    order = np.zeros(len(gains))
+                    order[col], order[col - 1] = 1, -1
+                    constraints.append(LinearConstraint(order, -np.inf, 0))
+
+        upper = [len(roster) // 3] * len(triples) + [1] * len(benches)
+        result = milp(-np.array(gains, dtype=float), constraints=constraints,
+                      integrality=np.ones(len(gains)), bounds=Bounds(0, upper))
+        if not result.success:
+            raise Exception(f'Team planning failed: {result.message}')
+        counts = np.rint(result.x).astype(int)
+
+        # The bench takes the weakest crabs of its kinds; teams get the rest, strongest first.
+        pools = {k: list(v) for k, v in by_kind.items()}
+        for (kind, _), count in zip(benches, counts[len(triples):]):
+            if count:
+                pools[kind].pop()
+        teams = []
+        for triple, count in zip(triples, counts[:len(triples)]):
+            for _ in range(count):
+                teams.append(position_team([pools[k].pop(0) for k in triple]))
+        return teams
+
+
+def position_team(crabs: list[CrabadaData]) -> PositionedTeam:
+    """Lay out a team the way assemble_team used to.
+
+    A tank (or failing that support, then dps) goes front top, a dps goes back top (or
+    front bottom if there is none), and the last crab goes front middle if it's a
+    tank/support or back middle if it's a dps.
+    """
+    remaining = list(crabs)
+
+    def take(*roles: str) -> CrabadaData:
+        for role in roles:
+            for crab in remaining:
+                if crab_role(crab) == role:
+                    remaining.remove(crab)
+                    return crab
+        return remaining.pop(0)
+
+    crab1 = take(TANK, SUP, DPS)
+    if any(crab_role(c) == DPS for c in remaining):
+        crab2, crab2p = take(DPS), '21'
+    else:
+        crab2, crab2p = take(TANK, SUP), '13'
+    crab3 = remaining.pop()
+    crab3p = '22' if crab_role(crab3) == DPS else '12'
+    return crab1, '11', crab2, crab2p, crab3, crab3p
+
+
+def plan_teams(roster: Roster, bad_comp_penalty: int, faction_bonus: int) -> list[PositionedTeam]:
+    return TeamPlanner(bad_comp_penalty, faction_bonus).plan(roster)
+
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Optional
+
+import aiohttp
+import requests
+
+from common.metrics import DEFAULT_METRICS
+
+logger = logging.getLogger(__name__)
+
+# Discord allows this many embeds per webhook message...
+MAX_EMBEDS_PER_POST = 10
+# ...and this many characters of text across all of them.
+MAX_CHARS_PER_POST = 6000
+# Alerts waiting to be posted before new ones get dropped.
+DEFAULT_MAX_QUEUED = 200
+# Attempts per post when Discord says we're rate limited.
+MAX_POST_ATTEMPTS = 3
+
+ALERTS_DROPPED = DEFAULT_METRICS.counter('battle_alerts_dropped_total', 'Alerts dropped because the queue was full')
+ALERTS_POSTED = DEFAULT_METRICS.counter('battle_alert_posts_total', 'Webhook posts, by outcome', ['result'])
+
+
+class QueuedAlert(object):
+    """One embed waiting to be posted, with where it goes and any message text (mentions)."""
+
+    def __init__(self, urls: list[str], embed: dict[str, Any], content: str = ''):
+        self.urls = urls
+        self.embed = embed
+        self.content = content
+
+    def batch_key(self) -> tuple:
+        """Alerts can share a post if they go to the same place with the same text."""
+        return tuple(self.urls), self.content
+
+
+class AlertQueue(object):
+    """Posts webhook embeds from a background task, so alerting never blocks the bot.
+
+    submit() just queues the embed. A worker coalesces queued embeds into as few posts as
+    Discord allows, waits out Discord's rate limit headers, and retries on 429s. If the
+    queue fills up (Discord is down or very slow), new alerts are dropped and counted, and
+    the next post says how many were lost.
+    """
+
+    def __init__(self, max_queued: int = DEFAULT_MAX_QUEUED, timeout_sec: float = 10):
+        self.max_queued = max_queued
+        self.timeout_sec = timeout_sec
+        self.dropped = 0
+        self._pending: deque[QueuedAlert] = deque()
+        # True while the worker is posting a batch it already took off the queue.
+        self._posting = False
+        # Unix time before which a webhook url shouldn't be posted to again.
+        self._blocked_until: dict[str, float] = {}
+        # Created lazily, in the loop that runs the worker.
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, urls: list[str], embed: dict[str, Any], content: str = ''):
+        """Queue an embed for posting. Never blocks when called from a running loop.
+
+        Outside of a loop (scripts), there's nothing to run the worker, so it posts inline.
+        """
+        alert = QueuedAlert(urls, embed, content)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            post_now(alert)
+            return
+
+        if len(self._pending) >= self.max_queued:
+            self.dropped += 1
+            ALERTS_DROPPED.inc()
+            return
+        self._pending.append(alert)
+        self._ensure_worker()
+        self._wakeup.set()
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            urls, payload = self.next_post()
+            self._posting = True
+            try:
+                for url in urls:
+                    try:
+                        await self._post(url, payload)
+                        ALERTS_POSTED.inc(result='ok')
+                    except Exception as ex:
+                        ALERTS_POSTED.inc(result='failed')
+                        logger.error('Failed to send webhook! %s', ex)
+            finally:
+                self._posting = False
+
+    def next_post(self) -> tuple[list[str], dict[str, Any]]:
+        """Take the oldest alert and as many later ones as can share its post."""
+        first = self._pending.popleft()
+        key = first.batch_key()
+        embeds = [first.embed]
+        chars = embed_chars(first.embed)
+        skipped = []
+        # Leave room to say how many alerts were dropped.
+        limit = MAX_EMBEDS_PER_POST - 1 if self.dropped else MAX_EMBEDS_PER_POST
+        while self._pending and len(embeds) < limit:
+            alert = self._pending.popleft()
+            alert_chars = embed_chars(alert.embed)
+            if alert.batch_key() != key or chars + alert_chars > MAX_CHARS_PER_POST:
+                skipped.append(alert)
+                continue
+            embeds.append(alert.embed)
+            chars += alert_chars
+        # Anything that didn't fit keeps its place at the front of the line.
+        self._pending.extendleft(reversed(skipped))
+
+        if self.dropped:
+            embeds.append({'title': 'Alerts dropped',
+                           'description': f'{self.dropped} alerts were dropped because the queue was full'})
+            self.dropped = 0
+
+        payload: dict[str, Any] = {'embeds': embeds}
+        if first.content:
+            payload['content'] = first.content
+        return first.urls, payload
+
+    async def _post(self, url: str, payload: dict[str, Any]):
+        for _ in range(MAX_POST_ATTEMPTS):
+            wait_sec = self._blocked_until.get(url, 0) - time.time()
+            if wait_sec > 0:
+                await asyncio.sleep(wait_sec)
+
+            async with self._get_session().post(url, json=payload) as resp:
+                if resp.status == 429:
+                    # Hit the limit anyway (shared webhook, or a global limit); wait it out.
+                    body = await resp.json(content_type=None)
+                    retry_after = float(resp.headers.get('Retry-After', body.get('retry_after', 1)))
+                    self._blocked_until[url] = time.time() + retry_after
+                    continue
+                resp.raise_for_status()
+                # Don't use up the bucket and then get a 429; wait for it to reset first.
+                if resp.headers.get('X-RateLimit-Remaining') == '0':
+                    reset_after = float(resp.headers.get('X-RateLimit-Reset-After', 1))
+                    self._blocked_until[url] = time.time() + reset_after
+                return
+        raise Exception(f'still rate limited after {MAX_POST_ATTEMPTS} attempts')
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout_sec))
+        return self._session
+
+    async def close(self, flush_timeout_sec: float = 10):
+        """Give queued alerts a chance to go out, then stop the worker."""
+        deadline = time.time() + flush_timeout_sec
+        while (self._pending or self._posting) and self._worker and not self._worker.done() \
+                and time.time() < deadline:
+            await asyncio.sleep(.1)
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def embed_chars(embed: dict[str, Any]) -> int:
+    """Roughly what Discord counts against the per-message text limit."""
+    return (len(embed.get('title', '')) + len(embed.get('description', ''))
+            + len(embed.get('footer', {}).get('text', '')) + len(embed.get('author', {}).get('name', '')))
+
+
+def post_now(alert: QueuedAlert):
+    """Blocking post of a single alert, for when there's no loop to queue on."""
+    payload: dict[str, Any] = {'embeds': [alert.embed]}
+    if alert.content:
+        payload['content'] = alert.content
+    for url in alert.urls:
+        try:
+            requests.post(url, json=payload, timeout=10).raise_for_status()
+        except Exception as ex:
+            logger.error('Failed to send webhook! %s', ex)
+
+
+# Shared by every AlertManager in the process, since they share the webhook's rate limit.
+DEFAULT_ALERT_QUEUE = AlertQueue()
+DEFAULT_METRICS.gauge('battle_alert_queue_depth', 'Alerts waiting to be posted').set_function(
+    DEFAULT_ALERT_QUEUE.depth)
@@ -28,10 +28,162 @@ class Config(object):
     #     """Discord role ID to ping for loot ready announcements."""
     #     return 0
 
+    @property
+    def battle_alert_digest(self) -> bool:
+        """Post one summary of successful actions instead of an alert per action; errors still post."""
+        return True
+
+    @property
+    def battle_alert_digest_window(self) -> int:
+        """Minimum seconds a digest collects for before it's posted; 0 posts one per cycle."""
+        return 0
+
+    @property
+    def battle_api_url(self) -> str:
+        """Base URL for the battle game API."""
+        return 'https://battle-system-api.crabada.com'
+
+    @property
+    def battle_record_file(self) -> str:
+        """If set, every API request/response is appended to this file (gzipped JSON lines, no tokens).
+
+        Defaults to the BATTLE_RECORD_FILE environment variable, so a run can be recorded
+        without editing this file.
+        """
+        return os.environ.get('BATTLE_RECORD_FILE', '')
+
+    @property
+    def battle_log_level(self) -> str:
+        """Lowest level logged: DEBUG, INFO, WARNING or ERROR."""
+        return 'INFO'
+
+    @property
+    def battle_log_levels(self) -> dict[str, str]:
+        """Per-module overrides of battle_log_level, e.g. {'common.cooldown': 'WARNING'}."""
+        return {}
+
+    @property
+    def battle_log_json(self) -> bool:
+        """Log one JSON object per line (with account/phase/mine_id fields) instead of plain text."""
+        return True
+
+    @property
+    def battle_metrics_port(self) -> int:
+        """Port to serve Prometheus metrics on at /metrics; 0 turns the endpoint off."""
+        return 0
+
+    @property
+    def battle_metrics_host(self) -> str:
+        """Interface the metrics endpoint listens on."""
+        return '127.0.0.1'
+
+    @property
+    def battle_profile_every(self) -> int:
+        """Profile every Nth bot cycle (stack samples plus a per-phase breakdown); 0 turns it off."""
+        return 0
+
+    @property
+    def battle_profile_dir(self) -> str:
+        """Directory cycle profiles are written to."""
+        return 'profiles'
+
+    @property
+    def battle_profile_interval_ms(self) -> float:
+        """Milliseconds between stack samples while profiling a cycle."""
+        return 5
+
+    @property
+    def battle_retry_attempts(self) -> int:
+        """Attempts per API request, counting the first, when failures look transient."""
+        return 3
+
+    @property
+    def battle_retry_base_delay(self) -> float:
+        """Longest wait (seconds) before the first retry; doubles per retry, with jitter."""
+        return .5
+
+    @property
+    def battle_retry_max_delay(self) -> float:
+        """Cap on the wait between retries, in seconds."""
+        return 8
+
+    @property
+    def battle_breaker_failures(self) -> int:
+        """Transient failures in a row before an endpoint is left alone for a while."""
+        return 5
+
+    @property
+    def battle_breaker_reset_sec(self) -> float:
+        """Seconds an endpoint is left alone before one request is allowed to test it."""
+        return 30
+
     @property
     def battle_poll_interval(self) -> int:
+        """Seconds to wait before trying again after a cycle fails."""
         return 30
 
+    @property
+    def battle_safety_poll_interval(self) -> int:
+        """Longest we'll sleep between cycles when no mine/loot/energy event is due."""
+        return 600
+
+    @property
+    def battle_accounts_file(self) -> str:
+        """JSON file with a list of key sets, used by run_battle_multi.py.
+
+        Each entry looks like battle_keys.json plus a 'name' used to label alerts.
+        """
+        return 'battle_accounts.json'
+
+    @property
+    def battle_max_concurrent_requests(self) -> int:
+        """Maximum API requests in flight at once, across all accounts in the process."""
+        return 4
+
+    @property
+    def battle_state_resync_interval(self) -> int:
+        """Seconds between full re-reads of crabs/inventory when nothing forces one sooner."""
+        return 300
+
+    @property
+    def battle_claim_concurrency(self) -> int:
+        """How many mine/loot claims can be in flight at once; battle_mutation_rate still applies."""
+        return 3
+
+    @property
+    def battle_feed_concurrency(self) -> int:
+        """How many crab feeds can be in flight at once; battle_mutation_rate still applies."""
+        return 4
+
+    @property
+    def battle_batch_feed_path(self) -> str:
+        """Path of an endpoint that feeds several crabs in one request, if the game has one.
+
+        Empty means crabs are fed one request each. If a batch feed fails, the bot goes back
+        to feeding one at a time until it restarts.
+        """
+        return ''
+
+    @property
+    def battle_read_rate(self) -> float:
+        """Sustained API reads per second, per account."""
+        return 2
+
+    @property
+    def battle_read_burst(self) -> int:
+        """API reads that can go out back to back before the read rate kicks in."""
+        return 5
+
+    @property
+    def battle_mutation_rate(self) -> float:
+        """Sustained API mutations (claims, crafts, feeds, etc) per second, per account."""
+        return 1
+
+    @property
+    def battle_mutation_burst(self) -> int:
+        """API mutations that can go out back to back before the mutation rate kicks in."""
+        return 1
+
     @property
     def battle_minimum_looter_level(self) -> int:
         return 3
@@ -48,6 +200,11 @@ class Config(object):
     def battle_enemy_badcomp_penalty(self) -> int:
         return 4
 
+    @property
+    def battle_faction_bonus(self) -> int:
+        """Score bonus for a team with two or more crabs from the same faction."""
+        return 2
+
     @property
     def battle_auto_level(self) -> bool:
         return False
@@ -1,9 +1,17 @@
+import logging
 from datetime import datetime, timedelta
 from typing import Dict
 
 from dateutil.tz import gettz
 
 from common.dates import pretty_time
+from common.metrics import DEFAULT_METRICS
+
+logger = logging.getLogger(__name__)
+
+COOLDOWN_CHECKS = DEFAULT_METRICS.counter('battle_cooldown_checks_total',
+                                          'Cooldown checks, by whether the action was allowed or dropped',
+                                          ['cooldown', 'result'])
 
 
 class CooldownManager(object):
@@ -21,13 +29,16 @@ class CooldownManager(object):
 
         cur_cooldown = self.team_cooldowns.get(team_id, datetime.now())
         if datetime.now() >= cur_cooldown:
-            print('Updating', self.name, 'cooldown for', team_id, 'to', cur_cooldown.strftime("%H:%M:%S"))
+            logger.info('Updating %s cooldown for %s to %s', self.name, team_id, cur_cooldown.strftime("%H:%M:%S"))
             self.team_cooldowns[team_id] = datetime.now() + timedelta(seconds=self.cooldown_sec)
+            COOLDOWN_CHECKS.inc(cooldown=self.name, result='allowed')
             return True
 
+        COOLDOWN_CHECKS.inc(cooldown=self.name, result='dropped')
+
         if do_cooldown_log:
             time_until = pretty_time((cur_cooldown - datetime.now()).seconds)
-            print('Cooldown for', self.name, 'on', team_id, 'expires in', time_until)
+            logger.info('Cooldown for %s on %s expires in %s', self.name, team_id, time_until)
         return False
 
 
@@ -47,7 +58,7 @@ class DateCooldown(object):
         new_date = self.get_date()
         if self.seen_date == new_date:
             return False
-        print(f'Updating date from {self.seen_date} to {new_date}')
+        logger.info('Updating date from %s to %s', self.seen_date, new_date)
         self.seen_date = new_date
         return True
 
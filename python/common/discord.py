@@ -1,22 +1,35 @@
+import logging
 import os
 import sys
 import time
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Any, Optional
 
 import requests
-from discord_webhook import DiscordWebhook, DiscordEmbed
 from web3 import Web3
 from web3.types import TxReceipt
 
+from common.alert_queue import AlertQueue, DEFAULT_ALERT_QUEUE
 from common.config_local import DEFAULT_CONFIG
 from common.git import fetch_version
 
+logger = logging.getLogger(__name__)
+
 LOOT_WEBHOOK = 'not for yu'
 
+# How loud each kind of alert is in the log, by its unexpected_status.
+STATUS_LOG_LEVELS = {
+    '': logging.INFO,
+    'Transient Error': logging.WARNING,
+    'Priority Event': logging.WARNING,
+    'Error': logging.ERROR,
+    'Critical Error': logging.CRITICAL,
+}
+
 
 def post_webhook(webhook_url: str, msg: str):
     """Posts a very simple webhook message to the provided url."""
-    print(f'Posting webhook: {msg}')
+    logger.info('Posting webhook: %s', msg)
     result = requests.post(webhook_url, json={"content": msg})
     result.raise_for_status()
 
@@ -27,75 +40,96 @@ def safe_post_webhook(webhook_url: str, msg: str):
         post_webhook(webhook_url, msg)
         time.sleep(.5)  # Prevent rate limiting
     except Exception as err:
-        print(f'Webhook failed: {err}')
+        logger.error('Webhook failed: %s', err)
 
 
-class AlertManager(object):
-    """Utility for tracking what we're doing, what happened, and alerting on it."""
+class AlertDigest(object):
+    """Successful events collected over a window, to be posted as one summary."""
 
     def __init__(self):
-        self.config = DEFAULT_CONFIG
-        self.total_gas_used_wei = 0
-        self.tus_remaining = 0
+        self.started_at = time.time()
+        # Totals by name, e.g. 'Mines won' -> 3. Events without a tally count by action.
+        self.tallies: dict[str, int] = {}
+        self.event_count = 0
 
-        self.action = ''
-        self.team_id = 0
-        self.game_id = 0
+    def add(self, action: str, tally: Optional[dict[str, int]] = None):
+        self.event_count += 1
+        for name, amount in (tally or {action: 1}).items():
+            self.tallies[name] = self.tallies.get(name, 0) + amount
 
-        self.tx_hash = ''
-        self.gas_used_wei = 0
+    def summary(self) -> str:
+        return '\n'.join(f'{name}: {amount}' for name, amount in self.tallies.items())
 
-        self.warn_error_escalation_text = ''
 
-    def start_action(self, action: str, team_id: int, game_id: Optional[int] = None):
-        self.reset()
+class AlertContext(object):
+    """One action being reported on, returned by AlertManager.start_action.
+
+    Each action gets its own context, so actions running concurrently (claims, feeds,
+    mine starts) can't mix up each other's titles, transactions or footers.
+    """
+
+    def __init__(self, manager: 'AlertManager', action: str = '', team_id: int = 0,
+                 game_id: Optional[int] = None):
+        self.manager = manager
+        self.config = manager.config
         self.action = action
         self.team_id = team_id
         self.game_id = game_id
 
+        self.tx_hash = ''
+        self.gas_used_wei = 0
+
+        self.warn_error_escalation_text = ''
+
     def tx_done(self, receipt: TxReceipt, extra_info: str = None,
                 gas_override: int = None, icon: str = None):
         self.tx_hash = receipt.transactionHash.hex()
         self.gas_used_wei = gas_override or (receipt.gasUsed * receipt.effectiveGasPrice)
-        self.total_gas_used_wei += self.gas_used_wei
+        self.manager.total_gas_used_wei += self.gas_used_wei
         explorer_link = f'https://subnets.avax.network/swimmer/mainnet/explorer/tx/{self.tx_hash}'
 
         if not receipt.status:
             content = f'[TX]({explorer_link}) unexpectedly failed. Check logs for more information.'
-            print(f'TX Error: {receipt}')
+            logger.error('TX Error: %s', receipt)
             self.error(content, icon=icon)
         else:
             content = (extra_info or 'Succeeded') + f' - [TX]({explorer_link})'
             self.ok(content, icon=icon)
 
-    def ok(self, content: str, icon: str = None):
-        self.post_webhook(self.action, content, '00A427', icon=icon)
+    def ok(self, content: str, icon: str = None, tally: Optional[dict[str, int]] = None):
+        """Report success; in digest mode, tally (e.g. {'Mines won': 1}) is what gets summarized."""
+        digest = self.manager.digest
+        if digest is not None:
+            logger.info('%s - %s - %s', self.webhook_context(), self.action, content)
+            digest.add(self.action, tally)
+            return
+        self.post_webhook(content, '00A427', icon=icon)
 
     def warn(self, content: str, icon: str = None):
         if self.warn_error_escalation_text:
             content += f' - Critical because: {self.warn_error_escalation_text}'
             self.critical(content, icon=icon)
             return
-        self.post_webhook(self.action, content, 'FFA500', icon=icon, unexpected_status='Transient Error')
+        self.post_webhook(content, 'FFA500', icon=icon, unexpected_status='Transient Error')
 
     def error(self, content: str, icon: str = None):
         if self.warn_error_escalation_text:
             content += f' - Critical because: {self.warn_error_escalation_text}'
             self.critical(content, icon=icon)
             return
-        self.post_webhook(self.action, content, 'CC0000', icon=icon, unexpected_status='Error')
+        self.post_webhook(content, 'CC0000', icon=icon, unexpected_status='Error')
 
     def priority(self, content: str, icon: str = None):
         if not self.config.webhook_critical_ping_user:
             content += ' - configure a DISCORD_PING_USER'
-        self.post_webhook(self.action, content, 'FFA500', icon=icon,
+        self.post_webhook(content, 'FFA500', icon=icon,
                           mention=self.config.webhook_critical_ping_user,
                           unexpected_status='Priority Event')
 
     def loot_available(self, content: str, icon: str = None):
         # if not self.config.webhook_critical_ping_user and not self.config.webhook_loot_ping_role:
         #     content += ' - configure a DISCORD_PING_USER or DISCORD_LOOT_PING_ROLE'
-        self.post_webhook(self.action, content, 'FFA500', icon=icon,
+        self.post_webhook(content, 'FFA500', icon=icon,
                           mention=self.config.webhook_critical_ping_user,
                           # mention_role=self.config.webhook_loot_ping_role,
                           unexpected_status='Priority Event')
@@ -103,32 +137,33 @@ class AlertManager(object):
     def critical(self, content: str, icon: str = None):
         if not self.config.webhook_critical_ping_user:
             content += ' - please configure a DISCORD_PING_USER'
-        self.post_webhook(self.action, content, 'CC0000', icon=icon,
+        self.post_webhook(content, 'CC0000', icon=icon,
                           mention=self.config.webhook_critical_ping_user,
                           unexpected_status='Critical Error')
 
     def webhook_context(self) -> str:
         if not self.team_id:
-            return 'Unexpected internal failure in ' + os.path.basename(sys.argv[0])
+            return self.manager.labeled('Unexpected internal failure in ' + os.path.basename(sys.argv[0]))
         v = f'Team {self.team_id}'
         if self.game_id:
             v += f' in Game {self.game_id}'
-        return v
+        return self.manager.labeled(v)
 
     def footer(self) -> str:
         parts = []
         if self.gas_used_wei:
-            parts.append(f'Gas {fmt_gas(self.gas_used_wei)} / Total {fmt_gas(self.total_gas_used_wei)}')
-        if self.tus_remaining:
-            parts.append(f'TUS: {round(self.tus_remaining, 0)}')
+            parts.append(f'Gas {fmt_gas(self.gas_used_wei)} / Total {fmt_gas(self.manager.total_gas_used_wei)}')
+        if self.manager.tus_remaining:
+            parts.append(f'TUS: {round(self.manager.tus_remaining, 0)}')
         parts.append(f'v{fetch_version()}')
         return ' | '.join(parts)
 
-    def post_webhook(self, action: str, content: str, color: str, icon: str = None,
+    def post_webhook(self, content: str, color: str, icon: str = None,
                      mention: int = None, mention_role: int = 0, unexpected_status: str = ''):
-        print(self.webhook_context(), '-', action, '-', content)
+        logger.log(STATUS_LOG_LEVELS.get(unexpected_status, logging.WARNING), '%s - %s - %s',
+                   self.webhook_context(), self.action, content)
         if self.tx_hash:
-            print(f'TX: {self.tx_hash}')
+            logger.info('TX: %s', self.tx_hash)
         if not self.config.discord_webhook:
             return
 
@@ -138,72 +173,124 @@ class AlertManager(object):
                 # This is so fucking awful
                 url.append(LOOT_WEBHOOK)
 
-            webhook = DiscordWebhook(url=url)
+            mentions = []
             if mention:
-                webhook.set_content(f'<@{mention}>')
+                mentions.append(f'<@{mention}>')
             if mention_role:
-                if webhook.content:
-                    webhook.content += ' - '
-                else:
-                    webhook.content = ''
-                webhook.content += f'<@&{mention_role}>'
+                mentions.append(f'<@&{mention_role}>')
 
-            title = self.webhook_context() + ' - ' + action
+            title = self.webhook_context() + ' - ' + self.action
             title_url = f'https://crabadatracker.app/profile/{self.config.address}'
-
-            embed = DiscordEmbed(
-                title=title,
-                url=title_url,
-                description=content,
-                color=color,
-                rate_limit_retry=True)
-            embed.set_footer(text=self.footer())
-            if unexpected_status:
-                embed.set_author(name=unexpected_status)
-            embed.set_timestamp()
-            if icon:
-                embed.set_thumbnail(url=icon)
-            webhook.add_embed(embed)
-            webhook.execute()
+            embed = make_embed(title, title_url, content, color=color, footer=self.footer(),
+                               author=unexpected_status, thumbnail=icon)
+            self.manager.alert_queue.submit(url, embed, ' - '.join(mentions))
         except Exception as ex:
-            print(f'Failed to send webhook! {ex}')
-            print(action, content, self.webhook_context(), self.footer())
-        finally:
-            self.reset()
-
-    def reset(self):
-        self.action = ''
-        self.team_id = 0
-        self.game_id = 0
-        self.tx_hash = ''
-        self.gas_used_wei = 0.0
-        self.warn_error_escalation_text = ''
+            logger.error('Failed to queue webhook! %s', ex)
+            logger.error('%s %s %s %s', self.action, content, self.webhook_context(), self.footer())
+
+
+class AlertManager(object):
+    """Utility for tracking what we're doing, what happened, and alerting on it.
+
+    Call start_action for each thing the bot does and report on the AlertContext it
+    returns. The ok/warn/error/etc shortcuts here report without an action, e.g. for
+    unexpected failures.
+
+    Webhooks are queued on an AlertQueue and posted in the background. In digest mode,
+    ok() events are collected and posted as one summary by flush_digest(); anything that
+    needs attention (warn, error, etc) still goes out right away.
+    """
+
+    def __init__(self, account: str = '', alert_queue: Optional[AlertQueue] = None):
+        self.config = DEFAULT_CONFIG
+        # Shared by default, since every account posts to the same webhook.
+        self.alert_queue = alert_queue or DEFAULT_ALERT_QUEUE
+        # Optional label that distinguishes accounts sharing a webhook.
+        self.account = account
+        self.total_gas_used_wei = 0
+        self.tus_remaining = 0
+
+        # Collects ok() events while in digest mode.
+        self.digest: Optional[AlertDigest] = None
+
+    def start_digest(self):
+        """Start collecting ok() events, unless a digest is already collecting."""
+        if self.digest is None:
+            self.digest = AlertDigest()
+
+    def flush_digest(self, min_window_sec: int = 0):
+        """Post the collected events as one embed, once the digest is at least min_window_sec old.
+
+        Collection continues into a fresh digest afterwards.
+        """
+        digest = self.digest
+        if digest is None or time.time() - digest.started_at < min_window_sec:
+            return
+        self.digest = AlertDigest()
+        if digest.event_count:
+            self.simple_embed('Summary', digest.summary())
+
+    def start_action(self, action: str, team_id: int, game_id: Optional[int] = None) -> AlertContext:
+        return AlertContext(self, action, team_id, game_id)
+
+    def ok(self, content: str, icon: str = None, tally: Optional[dict[str, int]] = None):
+        AlertContext(self).ok(content, icon=icon, tally=tally)
+
+    def warn(self, content: str, icon: str = None):
+        AlertContext(self).warn(content, icon=icon)
+
+    def error(self, content: str, icon: str = None):
+        AlertContext(self).error(content, icon=icon)
+
+    def priority(self, content: str, icon: str = None):
+        AlertContext(self).priority(content, icon=icon)
+
+    def critical(self, content: str, icon: str = None):
+        AlertContext(self).critical(content, icon=icon)
+
+    def labeled(self, text: str) -> str:
+        """Prefix text with the account name, if there is one."""
+        if not self.account:
+            return text
+        return f'[{self.account}] {text}'
+
+    def footer(self) -> str:
+        return AlertContext(self).footer()
 
     def simple_embed(self, action: str, content: str, mention: int = None):
-        print('-', action, '-', content, '-', mention)
+        action = self.labeled(action)
+        logger.info('- %s - %s - %s', action, content, mention)
         if not self.config.discord_webhook:
             return
 
         try:
             url = [self.config.discord_webhook]
-            webhook = DiscordWebhook(url=url)
-            if mention:
-                webhook.set_content(f'<@{mention}>')
-            title = action
             title_url = f'https://crabadatracker.app/profile/{self.config.address}'
-
-            embed = DiscordEmbed(
-                title=title,
-                url=title_url,
-                description=content,
-                rate_limit_retry=True)
-            embed.set_timestamp()
-            embed.set_footer(text=self.footer())
-            webhook.add_embed(embed)
-            webhook.execute()
+            embed = make_embed(action, title_url, content, footer=self.footer())
+            self.alert_queue.submit(url, embed, f'<@{mention}>' if mention else '')
         except Exception as ex:
-            print(f'Failed to send webhook! {ex}')
-            print(action, content)
+            logger.error('Failed to queue webhook! %s', ex)
+            logger.error('%s %s', action, content)
+
+
+def make_embed(title: str, url: str, description: str, color: str = None, footer: str = '',
+               author: str = '', thumbnail: str = None) -> dict[str, Any]:
+    """Discord embed JSON; color is hex like '00A427'."""
+    embed: dict[str, Any] = {
+        'title': title[:256],
+        'url': url,
+        'description': description[:4096],
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+    if color:
+        embed['color'] = int(color, 16)
+    if footer:
+        embed['footer'] = {'text': footer}
+    if author:
+        embed['author'] = {'name': author}
+    if thumbnail:
+        embed['thumbnail'] = {'url': thumbnail}
+    return embed
 
 
 def fmt_gas(gas_in_wei: int) -> str:
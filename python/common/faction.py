@@ -31,7 +31,12 @@ class Faction(IntEnum):
 
     @staticmethod
     def faction_for(c1: CrabClass, c2: CrabClass, c3: CrabClass):
-        freq = Counter([c1.faction(), c2.faction(), c3.faction()]).most_common()
+        return Faction.majority([c1.faction(), c2.faction(), c3.faction()])
+
+    @staticmethod
+    def majority(factions: list[Faction]):
+        """The team's faction: whichever one at least two of its crabs share, if any."""
+        freq = Counter(factions).most_common()
         if freq[0][1] >= 2:
             return freq[0][0]
         return None
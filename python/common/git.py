@@ -1,6 +1,9 @@
+import logging
 import subprocess
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 _version = None
 
 
@@ -11,5 +14,5 @@ def fetch_version() -> Optional[str]:
         try:
             _version = subprocess.run(cmd, stdout=subprocess.PIPE, text=True).stdout.strip()
         except Exception as ex:
-            print(ex)
+            logger.warning('Could not get the version from git: %s', ex)
     return _version
@@ -0,0 +1,119 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, TextIO
+
+from common.config_local import DEFAULT_CONFIG
+
+# Fields added to every record logged from the current task, e.g. account, phase, mine_id.
+# asyncio copies this into each new task, so concurrent accounts don't see each other's.
+_log_context: contextvars.ContextVar[dict[str, Any]] = contextvars.ContextVar('log_context', default={})
+
+
+def bind(**fields: Any):
+    """Add fields to every record logged from here on in the current task."""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Add fields to every record logged inside the block."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to a background thread for output, so logging never blocks on stdout.
+
+    Everything that depends on the caller (the message args, the traceback and the log
+    context) is resolved here, before the record leaves the calling task.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.context = _log_context.get()
+        return record
+
+
+class LogWriter(logging.handlers.QueueListener):
+    """Background thread writing queued records out; stop() is safe to call twice."""
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the log context as top level fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        line.update(getattr(record, 'context', {}))
+        if record.exc_text:
+            line['exc'] = record.exc_text
+        return json.dumps(line, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable lines for a terminal: time, level, context and message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        context = getattr(record, 'context', {})
+        prefix = ' '.join(f'{k}={v}' for k, v in context.items())
+        when = time.strftime('%H:%M:%S', time.localtime(record.created))
+        line = f'{when} {record.levelname:<7} {"[" + prefix + "] " if prefix else ""}{record.getMessage()}'
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+def setup_logging(level: str = 'INFO',
+                  module_levels: Optional[dict[str, str]] = None,
+                  json_lines: bool = True,
+                  stream: Optional[TextIO] = None) -> LogWriter:
+    """Send all logging through a queue to a background writer; call once at startup.
+
+    module_levels overrides the level for specific loggers, e.g. {'common.cooldown': 'WARNING'}.
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_lines else TextFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    writer = LogWriter(records, output)
+    writer.start()
+    # Flush whatever's still queued on the way out.
+    atexit.register(writer.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(records))
+    root.setLevel(level)
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+    return writer
+
+
+def setup_from_config() -> LogWriter:
+    """setup_logging with the levels and format from the config."""
+    return setup_logging(DEFAULT_CONFIG.battle_log_level, DEFAULT_CONFIG.battle_log_levels,
+                         DEFAULT_CONFIG.battle_log_json)
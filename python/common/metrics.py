@@ -0,0 +1,189 @@
+import math
+from typing import Callable, Iterable, Optional
+
+from aiohttp import web
+
+# Seconds; covers a fast API read up to a slow, throttled one.
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+LabelValues = tuple[str, ...]
+
+
+class Metric(object):
+    """A named metric with optional labels, rendered in the Prometheus text format."""
+
+    type_name = ''
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise Exception(f'{self.name} takes labels {self.label_names}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, key: LabelValues, extra: str = '') -> str:
+        parts = [f'{name}="{escape(value)}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError()
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Only goes up, e.g. requests made or alerts dropped."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [f'{self.name}{self._format_labels(k)} {format_value(v)}' for k, v in self.values.items()]
+
+
+class Gauge(Metric):
+    """A value that goes up and down; can also be read from a function when scraped."""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self.values: dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str):
+        self.values[self._key(labels)] = value
+
+    def set_function(self, fn: Callable[[], float]):
+        """Read the (unlabeled) value from fn at scrape time instead."""
+        self._function = fn
+
+    def samples(self) -> list[str]:
+        if self._function is not None:
+            return [f'{self.name} {format_value(self._function())}']
+        return [f'{self.name}{self._format_labels(k)} {format_value(v)}' for k, v in self.values.items()]
+
+
+class Histogram(Metric):
+    """Counts of observations (e.g. latencies) by bucket, plus their sum and count."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: count in each bucket (not cumulative), then the sum.
+        self.counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * len(self.buckets)
+            self.sums[key] = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self.sums[key] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == math.inf else f'le="{format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{self._format_labels(key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{self._format_labels(key)} {format_value(self.sums[key])}')
+            lines.append(f'{self.name}_count{self._format_labels(key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry(object):
+    """Every metric in the process, by name.
+
+    Asking for a metric that already exists returns it, so modules can declare the
+    metrics they use at import time without worrying about who got there first.
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def _get_or_create(self, metric_type: type, name: str, *args, **kwargs) -> Metric:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = metric_type(name, *args, **kwargs)
+        elif not isinstance(metric, metric_type):
+            raise Exception(f'Metric {name} is already a {metric.type_name}')
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def gauge(self, name: str, help_text: str, label_names: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets)
+
+    def render(self) -> str:
+        return '\n'.join(m.render() for m in self.metrics.values()) + '\n'
+
+
+class MetricsServer(object):
+    """Serves a registry at /metrics for Prometheus (or curl) to scrape."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or DEFAULT_METRICS
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, _: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type='text/plain')
+
+    async def start(self, host: str = '127.0.0.1', port: int = 9100) -> str:
+        """Start serving in the current loop; returns the URL of the metrics page."""
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        port = self._runner.addresses[0][1]
+        return f'http://{host}:{port}/metrics'
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# Shared by the whole process; there's one /metrics page no matter how many accounts run.
+DEFAULT_METRICS = MetricsRegistry()
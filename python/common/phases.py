@@ -0,0 +1,56 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from common.logs import log_context
+from common.metrics import DEFAULT_METRICS
+
+# Phases and whole cycles can take a while when there's a lot to claim or feed.
+PHASE_BUCKETS = (.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+PHASE_TIME = DEFAULT_METRICS.histogram('battle_phase_seconds', 'Time spent in each phase of a bot cycle',
+                                       ['phase'], PHASE_BUCKETS)
+CYCLE_TIME = DEFAULT_METRICS.histogram('battle_cycle_seconds', 'Time taken by a whole bot cycle',
+                                       buckets=PHASE_BUCKETS)
+
+
+class PhaseTimer(object):
+    """Wall time spent in each named phase of the current cycle.
+
+    Wrap each step of a cycle in `with timer.phase('name'):` and read `timings` once
+    the cycle is over. Phases that run more than once in a cycle add up.
+    """
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self.cycle_started = time.perf_counter()
+        # The phase we're in right now, if any.
+        self.current: Optional[str] = None
+
+    def start_cycle(self):
+        self.timings = {}
+        self.cycle_started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        previous, self.current = self.current, name
+        start = time.perf_counter()
+        try:
+            with log_context(phase=name):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0) + elapsed
+            self.current = previous
+            PHASE_TIME.observe(elapsed, phase=name)
+
+    def cycle_sec(self) -> float:
+        return time.perf_counter() - self.cycle_started
+
+    def finish_cycle(self) -> float:
+        """Record how long the cycle took, and return it."""
+        elapsed = self.cycle_sec()
+        CYCLE_TIME.observe(elapsed)
+        return elapsed
+
+    def summary(self) -> str:
+        return ', '.join(f'{name} {sec:.2f}s' for name, sec in self.timings.items())
@@ -0,0 +1,19 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable
+
+
+async def run_bounded(fn: Callable[[Any], Awaitable[Any]],
+                      items: Iterable[Any],
+                      concurrency: int) -> list[Any]:
+    """Run fn on every item with at most `concurrency` in flight.
+
+    Results come back in item order. A failure is returned in place of its result
+    instead of being raised, so one bad item doesn't abort the rest.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run_one(item):
+        async with slots:
+            return await fn(item)
+
+    return await asyncio.gather(*[run_one(i) for i in items], return_exceptions=True)
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Where a sample was, judged by the innermost frame that matches; first match wins.
+# The event loop sitting in select() means every task is waiting on the network (or a sleep);
+# the rest of 'network' is reading/writing sockets and aiohttp's request handling.
+CATEGORY_RULES = [
+    ('checksum', ('battle_client/encryption.py', 'Crypto/')),
+    ('decode', ('battle_client/types.py', 'json/decoder.py', 'json/__init__.py', 'dacite/')),
+    ('alerting', ('common/discord.py', 'common/alert_queue.py')),
+    ('network', ('selectors.py', 'selector_events.py', 'sslproto.py', 'aiohttp/')),
+]
+OTHER = 'other'
+NO_PHASE = 'none'
+
+# Only one sampler runs at a time; it sees every account in the process anyway.
+_active_sampler: Optional['StackSampler'] = None
+
+
+def frame_label(frame: FrameType) -> str:
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f'{module}:{frame.f_code.co_name}'
+
+
+def categorize(frame: FrameType) -> str:
+    """Which CATEGORY_RULES bucket a stack falls in, starting from its innermost frame."""
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace('\\', '/')
+        for category, patterns in CATEGORY_RULES:
+            if any(p in filename for p in patterns):
+                return category
+        frame = frame.f_back
+    return OTHER
+
+
+class StackSampler(object):
+    """Samples the calling thread's Python stack every interval_sec of wall time.
+
+    Much cheaper than tracing every call, so it's fine to leave on for a whole cycle.
+    Each sample is tagged with whatever phase_fn says we're in at that moment.
+
+    On the main thread of a Unix process this uses a SIGALRM timer, so samples land
+    wherever the code happens to be. Elsewhere it falls back to polling from a background
+    thread, which can only look while the sampled thread has released the GIL; that
+    over-counts C calls that release it (like the AES in the checksum).
+    """
+
+    def __init__(self, interval_sec: float, phase_fn: Callable[[], Optional[str]]):
+        self.interval_sec = interval_sec
+        self.phase_fn = phase_fn
+        # Collapsed stack ('outer;inner') -> samples.
+        self.stacks: dict[str, int] = {}
+        # Phase -> category -> samples.
+        self.breakdown: dict[str, dict[str, int]] = {}
+        self.samples = 0
+        self._previous_handler = None
+        self._thread_id = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGALRM, self._on_signal)
+            signal.setitimer(signal.ITIMER_REAL, self.interval_sec, self.interval_sec)
+            return
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._poll, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._previous_handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            self._previous_handler = None
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _on_signal(self, _: int, frame: Optional[FrameType]):
+        if frame is not None:
+            self._record(frame)
+
+    def _poll(self):
+        while not self._stop.wait(self.interval_sec):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._record(frame)
+
+    def _record(self, frame: FrameType):
+        phase = self.phase_fn() or NO_PHASE
+        labels = []
+        f = frame
+        while f is not None:
+            labels.append(frame_label(f))
+            f = f.f_back
+        labels.append(f'phase:{phase}')
+        stack = ';'.join(reversed(labels))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+        categories = self.breakdown.setdefault(phase, {})
+        category = categorize(frame)
+        categories[category] = categories.get(category, 0) + 1
+        self.samples += 1
+
+
+class CycleProfiler(object):
+    """Samples every Nth bot cycle and writes what it saw to disk.
+
+    For each sampled cycle, writes <name>-cycle<N>.collapsed (one 'frame;frame;frame count'
+    line per stack, ready for flamegraph.pl or speedscope) and <name>-cycle<N>.json, with
+    the seconds each phase spent on the network (mostly waiting), decoding, checksumming,
+    alerting, or doing anything else.
+
+    The sampler sees the whole event loop thread, so with several accounts in one process
+    a profile also includes whatever the other accounts were doing at the time. For the
+    same reason, a cycle isn't sampled if another account's profiler is already sampling.
+    """
+
+    def __init__(self, every_n_cycles: int, output_dir: str, interval_sec: float = .005, name: str = 'bot'):
+        self.every_n_cycles = every_n_cycles
+        self.output_dir = output_dir
+        self.interval_sec = interval_sec
+        self.name = name
+        self.cycle = 0
+        self._sampler: Optional[StackSampler] = None
+        self._started = 0.0
+
+    def start_cycle(self, phase_fn: Callable[[], Optional[str]]) -> bool:
+        """Count a cycle, and start sampling it if it's one of every Nth. Call from the loop thread."""
+        global _active_sampler
+        self.cycle += 1
+        if not self.every_n_cycles or self.cycle % self.every_n_cycles or _active_sampler is not None:
+            return False
+        self._sampler = _active_sampler = StackSampler(self.interval_sec, phase_fn)
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return True
+
+    def finish_cycle(self) -> Optional[str]:
+        """Stop sampling and write the profile; returns the path prefix written, if any."""
+        global _active_sampler
+        sampler = self._sampler
+        if sampler is None:
+            return None
+        sampler.stop()
+        self._sampler = _active_sampler = None
+        wall_sec = time.perf_counter() - self._started
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f'{self.name}-cycle{self.cycle}')
+        with open(prefix + '.collapsed', 'w') as f:
+            for stack, count in sorted(sampler.stacks.items(), key=lambda s: -s[1]):
+                f.write(f'{stack} {count}\n')
+        with open(prefix + '.json', 'w') as f:
+            json.dump(self.summary(sampler, wall_sec), f, indent=2)
+        logger.info('Wrote cycle profile (%d samples) to %s.*', sampler.samples, prefix)
+        return prefix
+
+    def summary(self, sampler: StackSampler, wall_sec: float) -> dict:
+        # Samples are spread evenly over the cycle, so scale counts to the cycle's wall time.
+        sec_per_sample = wall_sec / sampler.samples if sampler.samples else 0
+        return {
+            'cycle': self.cycle,
+            'wall_sec': wall_sec,
+            'samples': sampler.samples,
+            'interval_sec': self.interval_sec,
+            'phase_sec': {phase: {category: count * sec_per_sample for category, count in categories.items()}
+                          for phase, categories in sampler.breakdown.items()},
+        }
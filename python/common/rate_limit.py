@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Optional
+
+from common.metrics import DEFAULT_METRICS
+
+THROTTLED = DEFAULT_METRICS.counter('battle_throttled_requests_total',
+                                    'Requests that had to wait for the rate limiter', ['request_class'])
+THROTTLE_WAIT = DEFAULT_METRICS.counter('battle_throttle_wait_seconds_total',
+                                        'Time requests spent waiting for the rate limiter', ['request_class'])
+
+
+class TokenBucket(object):
+    """Async token bucket; callers wait for a token instead of being turned away.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. A capacity of 1
+    means requests are spaced at least 1/rate seconds apart. A rate of 0 disables it.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Created lazily so it binds to the running loop.
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Take a token, waiting for one if necessary. Returns the seconds spent waiting."""
+        if not self.rate:
+            return 0
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        start = time.monotonic()
+        # Holding the lock while sleeping keeps waiters in FIFO order.
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+        return time.monotonic() - start
+
+
+class ThrottleStats(object):
+    """How often and for how long a class of requests had to wait for a token."""
+
+    def __init__(self):
+        self.requests = 0
+        self.throttled = 0
+        self.wait_sec = 0.0
+
+    def record(self, wait_sec: float):
+        self.requests += 1
+        # Ignore scheduling noise; only count waits that were actually imposed.
+        if wait_sec > 0.001:
+            self.throttled += 1
+            self.wait_sec += wait_sec
+
+
+class RateLimiter(object):
+    """A token bucket per class of request, e.g. reads vs mutations.
+
+    Requests wait for a token rather than being dropped. Time spent waiting is tracked
+    per class so we can tell if the limits are too conservative.
+    """
+
+    def __init__(self, buckets: dict[str, TokenBucket]):
+        self.buckets = buckets
+        self.stats = {name: ThrottleStats() for name in buckets}
+
+    async def acquire(self, request_class: str):
+        wait_sec = await self.buckets[request_class].acquire()
+        stats = self.stats[request_class]
+        throttled = stats.throttled
+        stats.record(wait_sec)
+        if stats.throttled != throttled:
+            THROTTLED.inc(request_class=request_class)
+            THROTTLE_WAIT.inc(wait_sec, request_class=request_class)
+
+    def summary(self) -> str:
+        parts = []
+        for name, stats in self.stats.items():
+            parts.append(f'{name}: {stats.requests} requests, {stats.throttled} throttled for {stats.wait_sec:.1f}s')
+        return ' | '.join(parts)
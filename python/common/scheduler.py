@@ -0,0 +1,52 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Optional
+
+from common.dates import pretty_time
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler(object):
+    """Priority queue of timed wakeups, so the bot can sleep until something is actionable.
+
+    Deadlines are unix timestamps (the API reports times that way). A safety poll
+    caps how long we ever sleep, in case something happens that we didn't predict.
+    """
+
+    def __init__(self, safety_interval_sec: int, min_interval_sec: int = 2):
+        self.safety_interval_sec = safety_interval_sec
+        # Deadlines that land close together get handled in one wakeup.
+        self.min_interval_sec = min_interval_sec
+        self._deadlines: list[tuple[float, str]] = []
+
+    def schedule(self, when: float, reason: str):
+        """Request a wakeup at the given unix time; a past deadline means wake right away."""
+        heapq.heappush(self._deadlines, (when, reason))
+
+    def clear(self):
+        self._deadlines.clear()
+
+    def next_wakeup(self) -> tuple[float, str]:
+        """The next time we should wake up, and why.
+
+        Deadlines that passed while we were busy are still returned; wait() won't sleep
+        less than min_interval_sec for them.
+        """
+        now = time.time()
+        safety = (now + self.safety_interval_sec, 'safety poll')
+        if not self._deadlines:
+            return safety
+        return min(self._deadlines[0], safety)
+
+    async def wait(self, max_sleep_sec: Optional[float] = None) -> str:
+        """Sleep until the next wakeup, returning the reason for it."""
+        when, reason = self.next_wakeup()
+        sleep_sec = max(when - time.time(), self.min_interval_sec)
+        if max_sleep_sec is not None and sleep_sec > max_sleep_sec:
+            sleep_sec, reason = max_sleep_sec, 'retry'
+        logger.info('Sleeping %s until next event: %s', pretty_time(int(sleep_sec)), reason)
+        await asyncio.sleep(sleep_sec)
+        return reason
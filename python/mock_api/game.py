@@ -0,0 +1,254 @@
+import random
+import time
+from typing import Any, Optional
+
+from battle_client.types import InventoryItem, LV1_MATERIAL_IDS, MoneyItem
+
+# What the bot needs a crab to have to send it mining, and what a mine costs it.
+MINE_ENERGY_COST = 4
+MINE_POWER_COST = 2
+# Energy crabs get back each (simulated) day.
+DAILY_ENERGY = 24
+
+RECIPE_LV1_TUS = 1
+RECIPE_LV1_FOOD = 6
+TUS_PER_CRAFT = 51
+
+ITEM_NAMES = {
+    InventoryItem.FLAG_ID: 'Pirate Flag',
+    InventoryItem.FLORAL_ID: 'Purple Floral',
+    InventoryItem.CORAL_ID: 'Coral',
+    InventoryItem.OCTO_ID: 'Octopus Ink',
+    InventoryItem.TENTACRA_ID: 'Tentacra',
+    InventoryItem.SANDWICH_ID: 'Sandwich',
+}
+MONEY_NAMES = {
+    MoneyItem.TUS_ID: 'TUS',
+    MoneyItem.CRA_ID: 'CRA',
+    MoneyItem.SHELL_ID: 'Crystal Shell',
+    MoneyItem.CRAM_ID: 'CRAM',
+}
+
+
+class MockApiError(Exception):
+    """A failure the API reports through error_code rather than an HTTP status."""
+
+    def __init__(self, error_code: str, message: str):
+        super().__init__(f'{error_code}: {message}')
+        self.error_code = error_code
+        self.message = message
+
+
+class GameSettings(object):
+    """Knobs for how the simulated game behaves."""
+
+    def __init__(self,
+                 crabs_per_account: int = 30,
+                 mine_duration_sec: int = 4 * 60 * 60,
+                 win_rate: float = .75,
+                 starting_materials: int = 20,
+                 seed: Optional[int] = None):
+        self.crabs_per_account = crabs_per_account
+        self.mine_duration_sec = mine_duration_sec
+        self.win_rate = win_rate
+        self.starting_materials = starting_materials
+        self.seed = seed
+
+
+class MockAccount(object):
+    """Simulated state for one account: crabs, items, money and mines.
+
+    Payloads are kept as the dicts the API returns, so responses are just copies.
+    """
+
+    def __init__(self, user_id: int, settings: GameSettings, rng: random.Random, first_crab_id: int):
+        self.user_id = user_id
+        self.settings = settings
+        self.rng = rng
+        self.crabs: dict[int, dict[str, Any]] = {}
+        for crab_id in range(first_crab_id, first_crab_id + settings.crabs_per_account):
+            self.crabs[crab_id] = self._new_crab(crab_id)
+        self.inventory = {item_id: settings.starting_materials for item_id in LV1_MATERIAL_IDS}
+        self.inventory[InventoryItem.SANDWICH_ID] = 0
+        self.money = {MoneyItem.TUS_ID: 1000.0, MoneyItem.CRA_ID: 10.0, MoneyItem.SHELL_ID: 0.0,
+                      MoneyItem.CRAM_ID: 0.0}
+        # Unclaimed mines by id.
+        self.mines: dict[int, dict[str, Any]] = {}
+
+    def _new_crab(self, crab_id: int) -> dict[str, Any]:
+        level = self.rng.randint(1, 10)
+        return {
+            'crabada_id': crab_id,
+            'crabada_class': self.rng.randint(1, 8),
+            'level': level,
+            'real_level': level,
+            'power_level': self.rng.choice([0, 1, 10, 30]),
+            'max_power_level': 30,
+            'combat_power': self.rng.randint(3000, 6000),
+            'energy': {'energy': DAILY_ENERGY, 'reset_time': next_reset_time()},
+        }
+
+    def _refresh_energy(self, crab: dict[str, Any]):
+        if crab['energy']['reset_time'] <= time.time():
+            crab['energy'] = {'energy': DAILY_ENERGY, 'reset_time': next_reset_time()}
+
+    def _busy_crab_ids(self) -> set[int]:
+        return {m[f'crabada_id_{i}'] for m in self.mines.values() for i in (1, 2, 3)}
+
+    def sync(self) -> list[dict[str, Any]]:
+        for crab in self.crabs.values():
+            self._refresh_energy(crab)
+        return [dict(c) for c in self.crabs.values()]
+
+    def available_crabs(self) -> list[dict[str, Any]]:
+        busy = self._busy_crab_ids()
+        return [c for c in self.sync() if c['crabada_id'] not in busy]
+
+    def inventory_info(self) -> list[dict[str, Any]]:
+        return [{
+            'origin_item_id': item_id,
+            'amount': amount,
+            'item_name': ITEM_NAMES.get(item_id, str(item_id)),
+            'item_description': '',
+            'level': 1,
+            'experience': 0,
+            'durability': 100,
+        } for item_id, amount in self.inventory.items()]
+
+    def money_info(self) -> list[dict[str, Any]]:
+        return [{
+            'origin_item_id': item_id,
+            'amount': amount,
+            'user_id': self.user_id,
+            'item_name': MONEY_NAMES[item_id],
+        } for item_id, amount in self.money.items()]
+
+    def open_mines(self) -> list[dict[str, Any]]:
+        return [dict(m) for m in self.mines.values()]
+
+    def start_mine(self, node_id: int, crab_ids: list[int], positions: list[str], mine_id: int) -> dict[str, Any]:
+        if len(set(crab_ids)) != 3:
+            raise MockApiError('INVALID_TEAM', 'A mine needs three different crabs')
+        busy = self._busy_crab_ids()
+        for crab_id in crab_ids:
+            crab = self.crabs.get(crab_id)
+            if crab is None:
+                raise MockApiError('CRABADA_NOT_FOUND', f'Crabada {crab_id} not found')
+            self._refresh_energy(crab)
+            if crab_id in busy:
+                raise MockApiError('CRABADA_IS_BUSY', f'Crabada {crab_id} is already mining')
+            if crab['energy']['energy'] < MINE_ENERGY_COST:
+                raise MockApiError('NOT_ENOUGH_ENERGY', f'Crabada {crab_id} is out of energy')
+            if crab['power_level'] < MINE_POWER_COST:
+                raise MockApiError('CRABADA_IS_HUNGRY', f'Crabada {crab_id} needs to be fed')
+
+        for crab_id in crab_ids:
+            crab = self.crabs[crab_id]
+            crab['power_level'] -= MINE_POWER_COST
+            crab['energy'] = {**crab['energy'], 'energy': crab['energy']['energy'] - MINE_ENERGY_COST}
+
+        now = int(time.time())
+        won = self.rng.random() < self.settings.win_rate
+        mine = {
+            'mine_id': mine_id,
+            'node_id': node_id,
+            'miner_id': self.user_id,
+            'start_time': now,
+            'end_time': now + self.settings.mine_duration_sec,
+            'attack_time': 0,
+            'looter_id': 0,
+            'winner_id': self.user_id if won else 0,
+            'status': 1,
+            'rewards': [{'node_id': node_id, 'origin_item_id': self.rng.choice(LV1_MATERIAL_IDS),
+                         'amount': 3.0 if won else 1.0}],
+        }
+        for i, (crab_id, position) in enumerate(zip(crab_ids, positions), start=1):
+            mine[f'crabada_id_{i}'] = crab_id
+            mine[f'position_{i}'] = int(position)
+            mine[f'crabada_{i}_info'] = dict(self.crabs[crab_id])
+        self.mines[mine_id] = mine
+        return dict(mine)
+
+    def claim_mine(self, mine_id: int) -> dict[str, Any]:
+        mine = self.mines.get(mine_id)
+        if mine is None:
+            raise MockApiError('MINE_NOT_FOUND', f'Mine {mine_id} not found')
+        if mine['end_time'] > time.time():
+            raise MockApiError('MINE_NOT_FINISHED', f'Mine {mine_id} is still running')
+        del self.mines[mine_id]
+        for reward in mine['rewards']:
+            item_id = reward['origin_item_id']
+            self.inventory[item_id] = self.inventory.get(item_id, 0) + int(reward['amount'])
+        return dict(mine)
+
+    def claim_loot(self, mine_id: int) -> dict[str, Any]:
+        # Simulated accounts never loot.
+        raise MockApiError('LOOT_NOT_FOUND', f'Loot {mine_id} not found')
+
+    def feed(self, crab_id: int, food_id: int) -> dict[str, Any]:
+        crab = self.crabs.get(crab_id)
+        if crab is None:
+            raise MockApiError('CRABADA_NOT_FOUND', f'Crabada {crab_id} not found')
+        if self.inventory.get(food_id, 0) < 1:
+            raise MockApiError('NOT_ENOUGH_FOOD', f'No food {food_id} left')
+        self.inventory[food_id] -= 1
+        crab['power_level'] = crab['max_power_level']
+        return dict(crab)
+
+    def craft(self, body: dict[str, Any]) -> dict[str, Any]:
+        amount = body['amount']
+        if amount < 1:
+            raise MockApiError('INVALID_AMOUNT', 'Amount must be positive')
+        for i in range(1, 6):
+            material_id, material_amount = body[f'material_{i}_id'], body[f'material_{i}_amount']
+            if self.inventory.get(material_id, 0) < material_amount:
+                raise MockApiError('NOT_ENOUGH_MATERIAL', f'Not enough of material {material_id}')
+        for i in range(1, 6):
+            self.inventory[body[f'material_{i}_id']] -= body[f'material_{i}_amount']
+
+        if body['recipe_id'] == RECIPE_LV1_FOOD:
+            self.inventory[InventoryItem.SANDWICH_ID] += amount
+        elif body['recipe_id'] == RECIPE_LV1_TUS:
+            self.money[MoneyItem.TUS_ID] += amount * TUS_PER_CRAFT
+        else:
+            raise MockApiError('RECIPE_NOT_FOUND', f'Recipe {body["recipe_id"]} not found')
+        return {'recipe_id': body['recipe_id'], 'amount': amount}
+
+
+class MockGame(object):
+    """All simulated accounts, keyed by access token.
+
+    Accounts are created the first time a token is seen, so a load test only has to make
+    up tokens. Mine and crab ids are unique across accounts, like the real game.
+    """
+
+    def __init__(self, settings: Optional[GameSettings] = None):
+        self.settings = settings or GameSettings()
+        self.rng = random.Random(self.settings.seed)
+        self.accounts: dict[str, MockAccount] = {}
+        self._next_mine_id = 1_000_000
+
+    def account(self, access_token: str) -> MockAccount:
+        account = self.accounts.get(access_token)
+        if account is None:
+            user_id = len(self.accounts) + 1
+            first_crab_id = user_id * 10_000
+            account = MockAccount(user_id, self.settings, self.rng, first_crab_id)
+            self.accounts[access_token] = account
+        return account
+
+    def next_mine_id(self) -> int:
+        self._next_mine_id += 1
+        return self._next_mine_id
+
+
+def mine_zones() -> list[dict[str, Any]]:
+    """Every simulated account has cleared the same zones."""
+    return [{'node_id': node_id, 'is_mine_zone': node_id % 5 == 0, 'passed': True, 'can_attack': True}
+            for node_id in range(1, 11)]
+
+
+def next_reset_time() -> int:
+    """Energy resets at midnight UTC."""
+    day = 24 * 60 * 60
+    return (int(time.time()) // day + 1) * day
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+from aiohttp import web
+
+from battle_client.encryption import crabada_checksum
+from mock_api.game import MockAccount, MockApiError, MockGame, mine_zones
+
+PRIVATE = '/crabada-user/private'
+
+Handler = Callable[[MockAccount, dict[str, Any]], Any]
+
+
+class FaultSettings(object):
+    """Latency and failures to add to every request."""
+
+    def __init__(self,
+                 latency_sec: float = 0,
+                 latency_jitter_sec: float = 0,
+                 error_rate: float = 0,
+                 error_code: str = 'INTERNAL_SERVER_ERROR',
+                 verify_hash: bool = True,
+                 seed: Optional[int] = None):
+        self.latency_sec = latency_sec
+        self.latency_jitter_sec = latency_jitter_sec
+        # Fraction of requests that fail with error_code instead of doing anything.
+        self.error_rate = error_rate
+        self.error_code = error_code
+        # Reject mutations whose Hash header doesn't match the body.
+        self.verify_hash = verify_hash
+        self.rng = random.Random(seed)
+
+
+class MockBattleServer(object):
+    """Local stand-in for the battle game API, backed by a MockGame.
+
+    Serves every endpoint the client uses, with the same response envelope
+    (error_code/message/result). Requests are authenticated by bearer token only, and
+    every token is its own account. Point a client at it with base_url.
+    """
+
+    def __init__(self, game: Optional[MockGame] = None, faults: Optional[FaultSettings] = None):
+        self.game = game or MockGame()
+        self.faults = faults or FaultSettings()
+        # Requests served, by path; handy for checking what a bot actually did.
+        self.request_counts: dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        reads = {
+            '/sync': lambda a, _: a.sync(),
+            '/inventory/info': lambda a, _: a.inventory_info(),
+            '/money/info': lambda a, _: a.money_info(),
+            '/crabada/mine': lambda a, _: a.available_crabs(),
+            '/campaign/all/mine-zones': lambda a, _: mine_zones(),
+            '/campaign/mine-zones/mine/open/miner': lambda a, p: self._filter_node(a.open_mines(), p),
+            # Simulated accounts never loot.
+            '/campaign/mine-zones/mine/active/looting': lambda a, _: [],
+        }
+        mutations = {
+            '/campaign/mine-zones/mine/create': self._start_mine,
+            '/campaign/mine-zones/mine/claim': lambda a, b: a.claim_mine(b['mine_id']),
+            '/campaign/mine-zones/mine/looter-claim': lambda a, b: a.claim_loot(b['mine_id']),
+            '/crabada/eat': lambda a, b: a.feed(b['crabada_id'], b['food_id']),
+            '/crafting/money-food': lambda a, b: a.craft(b),
+        }
+        for path, handler in reads.items():
+            app.router.add_get(PRIVATE + path, self._wrap(handler, mutation=False))
+        for path, handler in mutations.items():
+            app.router.add_post(PRIVATE + path, self._wrap(handler, mutation=True))
+        return app
+
+    def _start_mine(self, account: MockAccount, body: dict[str, Any]) -> dict[str, Any]:
+        crab_ids = [body['crabada_id_1'], body['crabada_id_2'], body['crabada_id_3']]
+        positions = [body['p1'], body['p2'], body['p3']]
+        return account.start_mine(body['node_id'], crab_ids, positions, self.game.next_mine_id())
+
+    @staticmethod
+    def _filter_node(mines: list[dict[str, Any]], params: dict[str, Any]) -> list[dict[str, Any]]:
+        node_id = int(params.get('node_id', 0))
+        return [m for m in mines if not node_id or m['node_id'] == node_id]
+
+    def _wrap(self, handler: Handler, mutation: bool) -> Callable[[web.Request], Awaitable[web.Response]]:
+        async def handle(request: web.Request) -> web.Response:
+            self.request_counts[request.path] = self.request_counts.get(request.path, 0) + 1
+            await self._delay()
+            try:
+                if self.faults.error_rate and self.faults.rng.random() < self.faults.error_rate:
+                    raise MockApiError(self.faults.error_code, 'Injected failure')
+                account = self.game.account(bearer_token(request))
+                if mutation:
+                    body = await request.read()
+                    if self.faults.verify_hash and request.headers.get('Hash') != crabada_checksum(body):
+                        raise MockApiError('INVALID_HASH', 'Hash does not match the request body')
+                    args = json.loads(body)
+                else:
+                    args = dict(request.query)
+                return envelope(handler(account, args))
+            except MockApiError as ex:
+                return envelope(None, ex.error_code, ex.message)
+            except (KeyError, TypeError, ValueError) as ex:
+                return envelope(None, 'INVALID_PARAMS', f'Bad request: {ex!r}')
+
+        return handle
+
+    async def _delay(self):
+        latency = self.faults.latency_sec
+        if self.faults.latency_jitter_sec:
+            latency += self.faults.rng.uniform(0, self.faults.latency_jitter_sec)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> str:
+        """Start serving in the current loop; returns the base URL to give clients."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        # Port 0 picks a free port; find out which.
+        port = self._runner.addresses[0][1]
+        return f'http://{host}:{port}'
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def bearer_token(request: web.Request) -> str:
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer ') or len(auth) == len('Bearer '):
+        raise MockApiError('UNAUTHORIZED', 'Missing access token')
+    return auth[len('Bearer '):]
+
+
+def envelope(result: Any, error_code: Optional[str] = None, message: str = '') -> web.Response:
+    """Responses always come back 200 with the outcome in the body, like the real API."""
+    return web.json_response({'error_code': error_code, 'message': message, 'result': result})
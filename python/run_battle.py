@@ -4,22 +4,42 @@
 # The password and other options should be set in .env.
 
 import asyncio
+import logging
 
 from bots.battle import BattleManager
+from common.alert_queue import DEFAULT_ALERT_QUEUE
+from common.logs import setup_from_config
+from common.metrics import MetricsServer
 from common.session_shim import shim_session_send
 
+logger = logging.getLogger(__name__)
+
+
+async def run(bot: BattleManager):
+    metrics = MetricsServer()
+    if bot.config.battle_metrics_port:
+        logger.info('Serving metrics at %s', await metrics.start(bot.config.battle_metrics_host,
+                                                                 bot.config.battle_metrics_port))
+    try:
+        await asyncio.gather(
+            bot.mine_loop(),
+            # bot.config.refresh_loop(),
+        )
+    finally:
+        await metrics.stop()
+        await bot.battle_client.close()
+        # Let any alerts still queued go out before the loop closes.
+        await DEFAULT_ALERT_QUEUE.close()
+
 
 def main():
-    print('Loading')
+    setup_from_config()
+    logger.info('Loading')
 
     bot = BattleManager()
     loop = asyncio.get_event_loop()
     try:
-        loop.run_until_complete(
-            asyncio.gather(
-                bot.mine_loop(),
-                # bot.config.refresh_loop(),
-            ))
+        loop.run_until_complete(run(bot))
     finally:
         loop.close()
 
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+#
+# Runs battle game mining for every account in the accounts file, in one process.
+# Accounts share the HTTP connection pool and the Discord webhook, but each gets
+# its own BattleManager (and so its own cooldown state).
+
+import asyncio
+import json
+import logging
+import time
+
+from battle_client.client import AsyncBattleClient, default_transport
+from battle_client.single_flight import SingleFlight
+from bots.battle import BattleManager
+from common.alert_queue import DEFAULT_ALERT_QUEUE
+from common.config_local import DEFAULT_CONFIG
+from common.discord import AlertManager
+from common.logs import setup_from_config
+from common.metrics import MetricsServer
+from common.session_shim import shim_session_send
+
+logger = logging.getLogger(__name__)
+
+# Wait before restarting an account whose loop died; doubles each time it dies again quickly.
+RESTART_DELAY_SEC = 30
+MAX_RESTART_DELAY_SEC = 15 * 60
+
+
+def load_accounts(path: str) -> list[dict[str, str]]:
+    """Load the list of key sets; each entry is battle_keys.json plus a 'name'."""
+    with open(path, 'r') as f:
+        accounts = json.load(f)
+    for i, account in enumerate(accounts):
+        account.setdefault('name', f'account{i + 1}')
+    return accounts
+
+
+async def supervise(bot: BattleManager):
+    """Run one account's loop forever, restarting it if it dies.
+
+    Keeps one account's failure from taking down the others in the gather.
+    """
+    delay = RESTART_DELAY_SEC
+    while True:
+        started = time.monotonic()
+        try:
+            await bot.mine_loop()
+        except Exception as ex:
+            logger.exception('Game loop for %s died', bot.alert_manager.account)
+            bot.alert_manager.error(f'Game loop died, restarting in {delay}s: {ex}')
+        if time.monotonic() - started > MAX_RESTART_DELAY_SEC:
+            # It ran fine for a while, so this isn't the same failure over and over.
+            delay = RESTART_DELAY_SEC
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_RESTART_DELAY_SEC)
+
+
+async def run_accounts(accounts: list[dict[str, str]]):
+    # Shared so every account uses the same connection pool (and recording, if enabled).
+    transport = default_transport()
+    # Also shared, but keyed by token, so only clients for the same account share a read.
+    flights = SingleFlight()
+    bots = []
+    for account in accounts:
+        client = AsyncBattleClient(account['access_token'], account['refresh_token'], transport=transport,
+                                   flights=flights)
+        bots.append(BattleManager(client, AlertManager(account['name'])))
+    # One metrics page covers every account.
+    metrics = MetricsServer()
+    if DEFAULT_CONFIG.battle_metrics_port:
+        logger.info('Serving metrics at %s', await metrics.start(DEFAULT_CONFIG.battle_metrics_host,
+                                                                 DEFAULT_CONFIG.battle_metrics_port))
+    try:
+        await asyncio.gather(*[supervise(bot) for bot in bots])
+    finally:
+        await metrics.stop()
+        await transport.close()
+        await DEFAULT_ALERT_QUEUE.close()
+
+
+def main():
+    setup_from_config()
+    accounts = load_accounts(DEFAULT_CONFIG.battle_accounts_file)
+    logger.info('Loading %d accounts', len(accounts))
+
+    loop = asyncio.get_event_loop()
+    try:
+        loop.run_until_complete(run_accounts(accounts))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    shim_session_send()
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/python
+#
+# Runs a local mock of the battle game API, for testing the bot without touching the game.
+# Every access token is its own simulated account, created on first use.
+#
+# Point a client at it with AsyncBattleClient(token, base_url='http://127.0.0.1:8080').
+
+import argparse
+import asyncio
+
+from mock_api.game import GameSettings, MockGame
+from mock_api.server import FaultSettings, MockBattleServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock battle game API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--crabs', type=int, default=30, help='crabs per simulated account')
+    parser.add_argument('--mine-duration', type=int, default=4 * 60 * 60, help='seconds a mine takes')
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0, help='random extra latency, up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests that fail')
+    parser.add_argument('--error-code', default='INTERNAL_SERVER_ERROR', help='error_code for failed requests')
+    parser.add_argument('--no-verify-hash', action='store_true', help='accept mutations with a bad Hash')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    game = MockGame(GameSettings(crabs_per_account=args.crabs, mine_duration_sec=args.mine_duration,
+                                 seed=args.seed))
+    faults = FaultSettings(latency_sec=args.latency, latency_jitter_sec=args.jitter,
+                           error_rate=args.error_rate, error_code=args.error_code,
+                           verify_hash=not args.no_verify_hash, seed=args.seed)
+    server = MockBattleServer(game, faults)
+
+    async def serve():
+        url = await server.start(args.host, args.port)
+        print('Mock battle API listening on', url)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import asyncio
+
+from battle_client.client import AsyncBattleClient
+from battle_client.transport import HttpTransport
+from battle_client.types import InventorySummary
+from common.rate_limit import RateLimiter, TokenBucket
+from mock_api.game import GameSettings, MockGame
+from mock_api.server import MockBattleServer
+
+
+class SlowReads(HttpTransport):
+    """Holds on to GET responses for a while, as if they were slow to arrive."""
+
+    async def request(self, method: str, url: str, **kwargs):
+        resp = await super().request(method, url, **kwargs)
+        if method == 'GET':
+            await asyncio.sleep(.2)
+        return resp
+
+
+async def sandwiches(client: AsyncBattleClient) -> int:
+    return InventorySummary(await client.inventory()).sandwich_count
+
+
+async def start_client() -> tuple[MockBattleServer, AsyncBattleClient]:
+    server = MockBattleServer(MockGame(GameSettings(seed=1)))
+    url = await server.start(port=0)
+    unlimited = RateLimiter({'read': TokenBucket(0), 'mutation': TokenBucket(0)})
+    return server, AsyncBattleClient('account', transport=SlowReads(), base_url=url, rate_limiter=unlimited)
+
+
+def test_read_in_flight_during_mutation_isnt_cached():
+    async def run() -> tuple[int, int]:
+        server, client = await start_client()
+        try:
+            # The read gets its response before the craft, but hasn't returned yet.
+            before = asyncio.ensure_future(sandwiches(client))
+            await asyncio.sleep(.05)
+            await client.craft_lv1_food(5)
+            return await before, await sandwiches(client)
+        finally:
+            await client.close()
+            await server.stop()
+
+    assert asyncio.run(run()) == (0, 5)
+
+
+def test_read_in_flight_during_mutation_isnt_shared():
+    async def run() -> tuple[int, int]:
+        server, client = await start_client()
+        try:
+            before = asyncio.ensure_future(sandwiches(client))
+            await asyncio.sleep(.05)
+            await client.craft_lv1_food(5)
+            # Asked for after the craft, so it mustn't join the read from before it.
+            return await asyncio.gather(before, sandwiches(client))
+        finally:
+            await client.close()
+            await server.stop()
+
+    assert asyncio.run(run()) == [0, 5]
+
+
+def test_mutation_only_forgets_its_own_accounts_reads():
+    async def run() -> tuple[int, int]:
+        server, first = await start_client()
+        second = AsyncBattleClient('other account', transport=first.transport, base_url=first.base_url,
+                                   rate_limiter=first.rate_limiter, flights=first.flights)
+        try:
+            reads = [asyncio.ensure_future(sandwiches(second)) for _ in range(2)]
+            await asyncio.sleep(.05)
+            await first.craft_lv1_food(5)
+            # Joins the other account's read that's still in flight.
+            reads.append(asyncio.ensure_future(sandwiches(second)))
+            await asyncio.gather(*reads)
+            return first.flights.started, server.request_counts['/crabada-user/private/inventory/info']
+        finally:
+            await first.close()
+            await server.stop()
+
+    assert asyncio.run(run()) == (1, 1)
@@ -0,0 +1,150 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import RequestInfo
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from battle_client import retry
+from battle_client.client import AsyncBattleClient, CLAIM_MINE, FEED_CRAB, START_MINE
+from battle_client.retry import ApiError, CircuitBreaker, CircuitBreakers, CircuitOpenError, RetryPolicy
+from common.rate_limit import RateLimiter, TokenBucket
+
+MONEY = '/crabada-user/private/money/info'
+
+
+def http_error(status: int) -> aiohttp.ClientResponseError:
+    info = RequestInfo(URL('http://api'), 'POST', CIMultiDictProxy(CIMultiDict()))
+    return aiohttp.ClientResponseError(info, (), status=status)
+
+
+@pytest.mark.parametrize('ex', [asyncio.TimeoutError(), aiohttp.ClientConnectionError(), http_error(502),
+                                ApiError('INTERNAL_SERVER_ERROR', 'oops'), ApiError('BAD_RESPONSE', '?')])
+def test_mutations_arent_retried_when_they_may_have_landed(ex):
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(ex, 'GET', MONEY, 1)
+    assert policy.should_retry(ex, 'POST', CLAIM_MINE.path, 1)
+    assert not policy.should_retry(ex, 'POST', FEED_CRAB.path, 1)
+    assert not policy.should_retry(ex, 'POST', START_MINE.path, 1)
+
+
+@pytest.mark.parametrize('code', ['SERVICE_UNAVAILABLE', 'TOO_MANY_REQUESTS'])
+def test_rejected_mutations_are_retried(code):
+    assert RetryPolicy().should_retry(ApiError(code, ''), 'POST', FEED_CRAB.path, 1)
+
+
+@pytest.mark.parametrize('ex', [ApiError('NOT_ENOUGH_FOOD', ''), http_error(404), KeyError('error_code')])
+def test_request_problems_arent_retried(ex):
+    assert not RetryPolicy().should_retry(ex, 'GET', MONEY, 1)
+
+
+def test_retries_stop_at_max_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    ex = asyncio.TimeoutError()
+    assert policy.should_retry(ex, 'GET', MONEY, 2)
+    assert not policy.should_retry(ex, 'GET', MONEY, 3)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(retry, 'time', clock)
+    return clock
+
+
+def test_breaker_opens_then_half_opens_then_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_sec=30)
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state == 'half_open'
+    # One trial at a time.
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_sec=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_lost_trial_expires(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_sec=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    # The trial never reports back (e.g. it was cancelled).
+    clock.now += 30
+    assert breaker.allow()
+
+
+class StubTransport(object):
+    """Answers every request with the same body."""
+
+    def __init__(self, body):
+        self.body = body
+        self.requests = 0
+
+    async def request(self, method: str, url: str, **kwargs):
+        self.requests += 1
+        return self.body
+
+    async def close(self):
+        pass
+
+
+def stub_client(body, breakers: CircuitBreakers) -> tuple[AsyncBattleClient, StubTransport]:
+    transport = StubTransport(body)
+    unlimited = RateLimiter({'read': TokenBucket(0), 'mutation': TokenBucket(0)})
+    client = AsyncBattleClient('token', transport=transport, base_url='http://api', rate_limiter=unlimited,
+                               retry_policy=RetryPolicy(3, 0, 0), breakers=breakers)
+    return client, transport
+
+
+def test_non_api_response_is_retried_and_opens_the_circuit():
+    async def run():
+        breakers = CircuitBreakers(failure_threshold=2, reset_sec=30)
+        client, transport = stub_client({'message': 'Bad gateway'}, breakers)
+        # The retry after the second failure finds the circuit open.
+        with pytest.raises(CircuitOpenError):
+            await client.money()
+        assert transport.requests == 2
+        assert breakers.get(MONEY).state == 'open'
+        with pytest.raises(CircuitOpenError):
+            await client.money()
+        assert transport.requests == 2
+
+    asyncio.run(run())
+
+
+def test_request_error_closes_the_circuit():
+    async def run():
+        breakers = CircuitBreakers(failure_threshold=2, reset_sec=30)
+        breakers.get(MONEY).record_failure()
+        client, transport = stub_client({'error_code': 'NOT_ALLOWED', 'message': '', 'result': None}, breakers)
+        with pytest.raises(ApiError):
+            await client.money()
+        assert transport.requests == 1
+        assert breakers.get(MONEY).failures == 0
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+from common.scheduler import DeadlineScheduler
+
+
+def test_deadline_passed_while_busy_wakes_right_away():
+    scheduler = DeadlineScheduler(safety_interval_sec=600, min_interval_sec=0)
+    scheduler.schedule(time.time() + .2, 'mine 1 complete')
+    # The cycle is still running when the mine finishes.
+    time.sleep(.3)
+
+    when, reason = scheduler.next_wakeup()
+    assert reason == 'mine 1 complete'
+    assert when <= time.time()
+
+    started = time.monotonic()
+    assert asyncio.run(scheduler.wait()) == 'mine 1 complete'
+    assert time.monotonic() - started < .1
+
+
+def test_earliest_deadline_wins_over_safety_poll():
+    scheduler = DeadlineScheduler(safety_interval_sec=600)
+    now = time.time()
+    scheduler.schedule(now + 50, 'loot claimable')
+    scheduler.schedule(now + 30, 'mine complete')
+    assert scheduler.next_wakeup() == (now + 30, 'mine complete')
+
+    scheduler.clear()
+    assert scheduler.next_wakeup()[1] == 'safety poll'
@@ -0,0 +1,38 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from battle_client.types import CrabadaData
+from benchmarks.payloads import crab_payload
+from bots.roster import Roster
+from bots.teams import plan_teams, score_team
+
+
+def best_total(crabs: list[CrabadaData], bad_comp_penalty: int, faction_bonus: int) -> int:
+    """Best total score over every way of splitting crabs into teams, by brute force."""
+    if not crabs:
+        return 0
+    first, rest = crabs[0], crabs[1:]
+    return max(score_team([first, a, b], bad_comp_penalty, faction_bonus)
+               + best_total([c for c in rest if c is not a and c is not b], bad_comp_penalty, faction_bonus)
+               for a, b in combinations(rest, 2))
+
+
+def best_with_bench(crabs: list[CrabadaData], bad_comp_penalty: int, faction_bonus: int) -> int:
+    return max(best_total([c for c in crabs if c not in bench], bad_comp_penalty, faction_bonus)
+               for bench in combinations(crabs, len(crabs) % 3))
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_plan_matches_exhaustive_search(seed):
+    rng = random.Random(seed)
+    crabs = [CrabadaData.convert(crab_payload(i, rng)) for i in range(rng.randint(3, 9))]
+    bad_comp_penalty, faction_bonus = rng.choice([(0, 0), (5, 0), (5, 2), (20, 7)])
+
+    teams = plan_teams(Roster(crabs), bad_comp_penalty, faction_bonus)
+
+    used = [crab.crabada_id for team in teams for crab in team[::2]]
+    assert len(used) == len(set(used)) == len(crabs) // 3 * 3
+    planned = sum(score_team(list(team[::2]), bad_comp_penalty, faction_bonus) for team in teams)
+    assert planned == best_with_bench(crabs, bad_comp_penalty, faction_bonus)